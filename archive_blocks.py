@@ -0,0 +1,121 @@
+import os
+import zlib
+import struct
+from datetime import date
+
+import numpy as np
+
+BLOCK_MAGIC = b'SBLK'
+# magic, codec, first day, last day (days since 1970-01-01), row count, payload length
+BLOCK_HEADER = struct.Struct('<4sBiiII')
+CODECS = {'lzma': 1, 'zlib': 2}
+# Column name, dtype; each block stores them one after another, so similar values compress together.
+BLOCK_COLUMNS = [('day_numbers', '<i4'), ('seconds', '<i4'), ('product_codes', '<i4'),
+                 ('quantities', '<i4'), ('payment_cents', '<i8')]
+
+
+def archive_path_for(transactions_file):
+    return f"{transactions_file}.archive"
+
+
+def compress(codec_id, payload):
+    if codec_id == CODECS['lzma']:
+        import lzma  # loaded with the first archive block, not at startup
+        return lzma.compress(payload)
+    return zlib.compress(payload, 9)
+
+
+def decompress(codec_id, payload):
+    if codec_id == CODECS['lzma']:
+        import lzma
+        return lzma.decompress(payload)
+    return zlib.decompress(payload)
+
+
+class ArchiveBlock:
+    __slots__ = ('offset', 'codec', 'first_day', 'last_day', 'row_count', 'payload_length')
+
+    def __init__(self, offset, codec, first_day, last_day, row_count, payload_length):
+        self.offset = offset
+        self.codec = codec
+        self.first_day = first_day
+        self.last_day = last_day
+        self.row_count = row_count
+        self.payload_length = payload_length
+
+
+def encode_block(day_numbers, seconds, product_ids, quantities, payment_cents, codec='lzma'):
+    """Compresses one block of rows; product_ids holds one id string per row."""
+    local_ids, product_codes = np.unique(np.asarray(product_ids, dtype=str), return_inverse=True)
+    id_table = '\n'.join(local_ids.tolist()).encode('utf-8')
+    columns = [day_numbers, seconds, product_codes, quantities, payment_cents]
+    payload = struct.pack('<I', len(id_table)) + id_table + b''.join(
+        np.asarray(values, dtype=dtype).tobytes() for values, (_, dtype) in zip(columns, BLOCK_COLUMNS)
+    )
+    codec_id = CODECS[codec]
+    compressed = compress(codec_id, payload)
+    day_numbers = np.asarray(day_numbers)
+    return BLOCK_HEADER.pack(BLOCK_MAGIC, codec_id, int(day_numbers.min()), int(day_numbers.max()),
+                             len(day_numbers), len(compressed)) + compressed
+
+
+class SalesArchive:
+    """Closed months of sales in compressed column blocks, each headed by its date range.
+
+    Opening the archive reads only the block headers, so a query can skip every block
+    whose dates fall outside its range without decompressing it.
+    """
+
+    def __init__(self, archive_file):
+        self.archive_file = archive_file
+        self.blocks = []
+        with open(archive_file, 'rb') as file_stream:
+            while True:
+                offset = file_stream.tell()
+                header = file_stream.read(BLOCK_HEADER.size)
+                if len(header) < BLOCK_HEADER.size:
+                    break
+                magic, codec, first_day, last_day, row_count, payload_length = BLOCK_HEADER.unpack(header)
+                if magic != BLOCK_MAGIC:
+                    raise ValueError(f"'{archive_file}' is damaged at byte {offset}")
+                self.blocks.append(ArchiveBlock(offset, codec, first_day, last_day, row_count, payload_length))
+                file_stream.seek(payload_length, os.SEEK_CUR)
+
+    @property
+    def row_count(self):
+        return sum(block.row_count for block in self.blocks)
+
+    def read_blocks(self, blocks):
+        """Decompresses the given blocks and returns their rows as columns, with one product id per row."""
+        parts = {name: [] for name, _ in BLOCK_COLUMNS}
+        row_ids = []
+        with open(self.archive_file, 'rb') as file_stream:
+            for block in blocks:
+                file_stream.seek(block.offset + BLOCK_HEADER.size)
+                payload = decompress(block.codec, file_stream.read(block.payload_length))
+                id_table_length, = struct.unpack_from('<I', payload)
+                position = 4 + id_table_length
+                local_ids = payload[4:position].decode('utf-8').split('\n')
+                for name, dtype in BLOCK_COLUMNS:
+                    values = np.frombuffer(payload, dtype=dtype, count=block.row_count, offset=position)
+                    parts[name].append(values)
+                    position += values.nbytes
+                row_ids.extend(local_ids[code] for code in parts['product_codes'][-1].tolist())
+        columns = [np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+                   for name, dtype in BLOCK_COLUMNS]
+        return columns[0], columns[1], row_ids, columns[3], columns[4]
+
+    def blocks_before(self, loaded_from_day, start_day):
+        """Blocks not loaded yet (ending before loaded_from_day; None if nothing is) that reach start_day."""
+        return [block for block in self.blocks
+                if (loaded_from_day is None or block.last_day < loaded_from_day) and block.last_day >= start_day]
+
+
+def month_start_day(year, month):
+    return (date(year, month, 1) - date(1970, 1, 1)).days
+
+
+def row_columns(transaction_records, rows):
+    return (transaction_records.dates.view(np.int64)[rows], transaction_records.seconds[rows],
+            [transaction_records.product_ids[code] for code in transaction_records.codes[rows].tolist()],
+            transaction_records.quantities[rows], transaction_records.payment_cents[rows])
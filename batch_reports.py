@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+
+from inventory_manager import lookup_item_by_id
+from transaction_processor import aggregate_monthly_sales, aggregate_product_sales_totals, name_product_totals
+from sales_charts import plot_monthly_sales_chart, plot_product_totals_chart
+from transaction_journal import replay_journal, journal_path_for
+from data_files import load_transaction_history, load_inventory
+from sharded_sales import ShardedSales
+
+# Example report spec:
+# {
+#   "output_dir": "reports",
+#   "overall_monthly": [{"start": "01/2023", "end": "12/2023"}],
+#   "product_monthly": [{"start": "01/2023", "end": "12/2023", "product_ids": ["1", "7"]}],
+#   "product_totals": [{"start": "01/01/2023", "end": "31/12/2023"}]
+# }
+# "product_ids" may be left out to chart every product in the inventory.
+
+
+def parse_month(month_year_str):
+    month_year_obj = datetime.strptime(month_year_str, "%m/%Y")
+    return month_year_obj.year, month_year_obj.month
+
+
+def parse_day(date_str):
+    return datetime.strptime(date_str, "%d/%m/%Y").date()
+
+
+def safe_file_part(text):
+    return ''.join(char if char.isalnum() or char in '-_' else '_' for char in str(text))
+
+
+def build_chart_jobs(spec, transaction_records, inventory_records, output_dir):
+    """Runs every aggregation in the spec in this process and returns plain-data chart jobs."""
+    chart_jobs = []
+    for report in spec.get('overall_monthly', []):
+        start_year, start_month = parse_month(report['start'])
+        end_year, end_month = parse_month(report['end'])
+        monthly_data = aggregate_monthly_sales(transaction_records, start_year, start_month, end_year, end_month)
+        if monthly_data:
+            chart_jobs.append(('monthly', monthly_data, 'num_sales', 'Number of Sales',
+                               f'Overall Monthly Sales Performance ({start_month}/{start_year} - {end_month}/{end_year})',
+                               os.path.join(output_dir, f"overall_monthly_{start_year}-{start_month:02d}_{end_year}-{end_month:02d}.png")))
+
+    for report in spec.get('product_monthly', []):
+        start_year, start_month = parse_month(report['start'])
+        end_year, end_month = parse_month(report['end'])
+        product_ids = report.get('product_ids') or [item.id for item in inventory_records]
+        for product_id in product_ids:
+            product_id = str(product_id)
+            product = lookup_item_by_id(inventory_records, product_id)
+            product_name = product.name if product else f"Product {product_id}"
+            monthly_data = aggregate_monthly_sales(
+                transaction_records, start_year, start_month, end_year, end_month, product_id=product_id
+            )
+            if monthly_data:
+                chart_jobs.append(('monthly', monthly_data, 'quantity', 'Total Quantity Sold',
+                                   f'Monthly Sales Performance for {product_name} ({start_month}/{start_year} - {end_month}/{end_year})',
+                                   os.path.join(output_dir, f"product_{safe_file_part(product_id)}_monthly_{start_year}-{start_month:02d}_{end_year}-{end_month:02d}.png")))
+
+    for report in spec.get('product_totals', []):
+        start_date_obj, end_date_obj = parse_day(report['start']), parse_day(report['end'])
+        product_sales_totals = aggregate_product_sales_totals(transaction_records, start_date_obj, end_date_obj)
+        if product_sales_totals:
+            chart_jobs.append(('totals', name_product_totals(product_sales_totals, inventory_records, lookup_item_by_id),
+                               f"Total Sales Value per Product ({report['start']} - {report['end']})",
+                               os.path.join(output_dir, f"product_totals_{start_date_obj}_{end_date_obj}.png")))
+    return chart_jobs
+
+
+def render_chart_job(chart_job):
+    kind, *arguments = chart_job
+    if kind == 'monthly':
+        plot_monthly_sales_chart(*arguments)
+    else:
+        plot_product_totals_chart(*arguments)
+    return arguments[-1]
+
+
+def render_chart_jobs(chart_jobs, workers=None):
+    if workers == 1:
+        return [render_chart_job(chart_job) for chart_job in chart_jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(render_chart_job, chart_jobs, chunksize=4))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render sales report charts to PNG files without the interactive menu.")
+    parser.add_argument('transactions_file', help="sales CSV, or a directory of store/month shards")
+    parser.add_argument('inventory_file')
+    parser.add_argument('spec_file', help="JSON report spec (see the example at the top of batch_reports.py)")
+    parser.add_argument('--workers', type=int, default=None, help="aggregation and rendering processes (default: one per core)")
+    parser.add_argument('--snapshot', action='store_true', help="use and refresh the binary snapshots")
+    parser.add_argument('--stores', help="comma-separated stores to include when reading shards (default: all)")
+    args = parser.parse_args()
+
+    try:
+        with open(args.spec_file, 'r', encoding='utf-8') as file_stream:
+            spec = json.load(file_stream)
+    except (OSError, ValueError) as err:
+        print(f"Failed to read report spec '{args.spec_file}': {err}")
+        sys.exit(1)
+
+    inventory_records = load_inventory(args.inventory_file, args.snapshot)
+    if os.path.isdir(args.transactions_file):
+        # Shards are read per report, and only those in its date range.
+        transaction_records = ShardedSales(args.transactions_file, args.stores.split(',') if args.stores else None,
+                                           args.workers)
+    else:
+        transaction_records = load_transaction_history(args.transactions_file, args.snapshot, args.workers)
+        replay_journal(journal_path_for(args.transactions_file), transaction_records, inventory_records)
+
+    output_dir = spec.get('output_dir', 'reports')
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        chart_jobs = build_chart_jobs(spec, transaction_records, inventory_records, output_dir)
+    except (KeyError, ValueError) as err:
+        print(f"Invalid report spec: {err}")
+        sys.exit(1)
+
+    for output_file in render_chart_jobs(chart_jobs, args.workers):
+        print(f"Chart written to '{output_file}'.")
+    print(f"{len(chart_jobs)} charts rendered into '{output_dir}'.")
+
+
+if __name__ == "__main__":
+    main()
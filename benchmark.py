@@ -0,0 +1,227 @@
+import io
+import os
+import csv
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import date, timedelta
+
+import numpy as np
+
+from inventory_manager import lookup_item_by_id, lookup_item_by_name
+from transaction_processor import (
+    find_transaction_rows, aggregate_monthly_sales, aggregate_product_sales_totals
+)
+from transaction_store import MonthlySalesRollup
+from main_app import initialize_system_data
+from data_files import persist_system_data
+
+
+def generate_inventory(product_count, rng):
+    words = ['Dog', 'Puppy', 'Food', 'Collar', 'Chews', 'Milk', 'Cream', 'Drops', 'Crate',
+             'Muzzle', 'Clipper', 'Beef', 'Chicken', 'Rice', 'Powder', 'Leash', 'Bowl', 'Toy']
+    inventory = []
+    for product_number in range(1, product_count + 1):
+        name_words = rng.choice(words, size=3)
+        inventory.append({
+            'id': str(product_number),
+            'name': f"{' '.join(name_words)} {product_number}",
+            'price': f"{rng.uniform(1, 40):.2f}",
+            'stock': str(int(rng.integers(0, 500))),
+        })
+    return inventory
+
+
+def generate_sales_rows(row_count, inventory, rng, start_date=date(2015, 1, 1), years=8, chunk_days=64):
+    """Yields sales rows in time order with weekend and December peaks, like the shop's own sales.csv."""
+    day_count = years * 365
+    days = [start_date + timedelta(days=offset) for offset in range(day_count)]
+    weights = np.array([(1.6 if day.weekday() >= 5 else 1.0) * (1.5 if day.month == 12 else 1.0) for day in days])
+    rows_per_day = rng.multinomial(row_count, weights / weights.sum())
+    # Popularity follows a Zipf-like curve so a few products dominate, as in real catalogs.
+    popularity = 1.0 / np.arange(1, len(inventory) + 1)
+    popularity /= popularity.sum()
+    prices = np.array([float(item['price']) for item in inventory])
+
+    for chunk_start in range(0, day_count, chunk_days):
+        chunk_counts = rows_per_day[chunk_start:chunk_start + chunk_days]
+        chunk_rows = int(chunk_counts.sum())
+        if not chunk_rows:
+            continue
+        products = rng.choice(len(inventory), size=chunk_rows, p=popularity)
+        quantities = rng.integers(1, 6, size=chunk_rows)
+        seconds = np.sort(rng.integers(8 * 3600, 19 * 3600, size=chunk_rows))
+        position = 0
+        for day, count in zip(days[chunk_start:chunk_start + chunk_days], chunk_counts):
+            date_str = day.strftime("%d/%m/%Y")
+            day_seconds = np.sort(seconds[position:position + count])
+            for offset, second in enumerate(day_seconds.tolist(), start=position):
+                product = products[offset]
+                quantity = int(quantities[offset])
+                yield (date_str, f"{second // 3600}:{second % 3600 // 60:02d}:{second % 60:02d}",
+                       inventory[product]['id'], quantity, f"{quantity * prices[product]:.2f}")
+            position += count
+
+
+def write_dataset(workdir, row_count, product_count, seed=7):
+    rng = np.random.default_rng(seed)
+    inventory = generate_inventory(product_count, rng)
+    paths = {name: os.path.join(workdir, f"{name}.csv") for name in ('sales', 'puppy', 'users')}
+    with open(paths['puppy'], 'w', newline='', encoding='utf-8') as file_stream:
+        csv_writer = csv.DictWriter(file_stream, fieldnames=['id', 'name', 'price', 'stock'])
+        csv_writer.writeheader()
+        csv_writer.writerows(inventory)
+    with open(paths['sales'], 'w', newline='', encoding='utf-8') as file_stream:
+        csv_writer = csv.writer(file_stream)
+        csv_writer.writerow(['date', 'time', 'id', 'quantity', 'payment'])
+        csv_writer.writerows(generate_sales_rows(row_count, inventory, rng))
+    with open(paths['users'], 'w', newline='', encoding='utf-8') as file_stream:
+        file_stream.write("username,password,type\nbench,bench,manager\n")
+    return paths, inventory
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run_case(name, func, repeat, rows_processed=None):
+    """Times func `repeat` times, then measures its peak traced memory in one extra run."""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        tracemalloc.start()
+        func()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    return {
+        'case': name,
+        'runs': repeat,
+        'p50_ms': percentile(timings, 0.50) * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'ops_per_s': 1 / mean if mean else float('inf'),
+        'rows_per_s': rows_processed / mean if rows_processed and mean else None,
+        'peak_mb': peak_bytes / (1024 * 1024),
+    }
+
+
+def build_rollup_with(transaction_records, workers):
+    transaction_records.aggregation_workers = workers
+    try:
+        return MonthlySalesRollup.build(transaction_records)
+    finally:
+        transaction_records.aggregation_workers = 1
+
+
+def product_totals_with(transaction_records, workers, start_date, end_date):
+    transaction_records.aggregation_workers = workers
+    try:
+        return aggregate_product_sales_totals.__wrapped__(transaction_records, start_date, end_date)
+    finally:
+        transaction_records.aggregation_workers = 1
+
+
+def run_benchmarks(paths, inventory, repeat, load_repeat, workers=None):
+    transactions_file, inventory_file = paths['sales'], paths['puppy']
+    transaction_records, inventory_records, _ = initialize_system_data(transactions_file, inventory_file, paths['users'])
+    row_count = transaction_records.size
+    rng = np.random.default_rng(11)
+    sample_ids = [inventory[int(position)]['id'] for position in rng.integers(0, len(inventory), size=1000)]
+    sample_names = [inventory[int(position)]['name'].split()[1].lower() for position in rng.integers(0, len(inventory), size=50)]
+    first_day = transaction_records.dates[0].astype(date)
+    last_day = transaction_records.dates[-1].astype(date)
+    middle_day = first_day + (last_day - first_day) / 2
+    quarter_end = middle_day + timedelta(days=90)
+    popular_ids = [item['id'] for item in inventory[:5]]
+    persist_dir = tempfile.mkdtemp(prefix='persist-', dir=os.path.dirname(transactions_file))
+
+    cases = [
+        ('initialize_system_data', lambda: initialize_system_data(transactions_file, inventory_file, paths['users']),
+         load_repeat, row_count),
+        ('persist_system_data', lambda: persist_system_data(
+            os.path.join(persist_dir, 'sales.csv'), os.path.join(persist_dir, 'puppy.csv'),
+            transaction_records, inventory_records), load_repeat, row_count),
+        ('lookup_item_by_id x1000', lambda: [lookup_item_by_id(inventory_records, item_id) for item_id in sample_ids],
+         repeat, None),
+        ('lookup_item_by_name x50', lambda: [lookup_item_by_name(inventory_records, name) for name in sample_names],
+         repeat, None),
+        ('search by date', lambda: transaction_records.rows(
+            find_transaction_rows(transaction_records, start_date=middle_day, end_date=middle_day)), repeat, None),
+        ('search by product name', lambda: transaction_records.rows(
+            find_transaction_rows(transaction_records, product_ids=popular_ids[-1:])), repeat, None),
+        ('search by product and date range', lambda: transaction_records.rows(
+            find_transaction_rows(transaction_records, product_ids=popular_ids, start_date=middle_day,
+                                  end_date=quarter_end)), repeat, None),
+        # The aggregation cases call the functions behind the report cache so every run does the work.
+        ('overall monthly aggregation', lambda: aggregate_monthly_sales.__wrapped__(
+            transaction_records, first_day.year, first_day.month, last_day.year, last_day.month), repeat, None),
+        ('product monthly aggregation', lambda: aggregate_monthly_sales.__wrapped__(
+            transaction_records, first_day.year, first_day.month, last_day.year, last_day.month,
+            product_id=popular_ids[0]), repeat, None),
+        ('product totals aggregation', lambda: aggregate_product_sales_totals.__wrapped__(
+            transaction_records, first_day, last_day), repeat, row_count),
+        ('product totals aggregation, cached', lambda: aggregate_product_sales_totals(
+            transaction_records, first_day, last_day), repeat, None),
+        ('product totals, parallel', lambda: product_totals_with(
+            transaction_records, workers, first_day, last_day), load_repeat, row_count),
+        ('monthly rollup build', lambda: build_rollup_with(transaction_records, 1), load_repeat, row_count),
+        ('monthly rollup build, parallel', lambda: build_rollup_with(transaction_records, workers),
+         load_repeat, row_count),
+    ]
+    try:
+        return [run_case(name, func, case_repeat, rows) for name, func, case_repeat, rows in cases]
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+def print_results(results, row_count, product_count):
+    print(f"\nShop benchmark: {row_count:,} sales rows, {product_count:,} products")
+    print(f"{'CASE':<34} {'RUNS':>5} {'P50 ms':>10} {'P95 ms':>10} {'P99 ms':>10} {'OPS/s':>10} {'ROWS/s':>12} {'PEAK MB':>9}")
+    print("=" * 106)
+    for result in results:
+        rows_per_s = f"{result['rows_per_s']:,.0f}" if result['rows_per_s'] else '-'
+        print(f"{result['case']:<34} {result['runs']:>5} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+              f"{result['p99_ms']:>10.3f} {result['ops_per_s']:>10.1f} {rows_per_s:>12} {result['peak_mb']:>9.1f}")
+    print("=" * 106)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic shop data and time the hot paths.")
+    parser.add_argument('--rows', type=int, default=100_000, help="sales rows to generate (10k to 50M)")
+    parser.add_argument('--products', type=int, default=1_000)
+    parser.add_argument('--repeat', type=int, default=20, help="runs per fast case")
+    parser.add_argument('--load-repeat', type=int, default=3, help="runs for load, save and full-history builds")
+    parser.add_argument('--workers', type=int, default=None, help="processes for the parallel cases (default: one per core)")
+    parser.add_argument('--workdir', help="directory for the generated files (default: a temporary one)")
+    parser.add_argument('--keep', action='store_true', help="keep the generated files")
+    parser.add_argument('--json', dest='json_file', help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='shop-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        started = time.perf_counter()
+        paths, inventory = write_dataset(workdir, args.rows, args.products)
+        print(f"Generated {args.rows:,} sales rows in {time.perf_counter() - started:.1f}s under '{workdir}'.")
+        results = run_benchmarks(paths, inventory, args.repeat, args.load_repeat, args.workers)
+        print_results(results, args.rows, args.products)
+        if args.json_file:
+            with open(args.json_file, 'w', encoding='utf-8') as file_stream:
+                json.dump({'rows': args.rows, 'products': args.products, 'results': results}, file_stream, indent=2)
+            print(f"Results written to '{args.json_file}'.")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import sys
+import csv
+import time
+import argparse
+from array import array
+from datetime import datetime, date
+
+from inventory_manager import Product, INVENTORY_COLUMNS, generate_next_item_id, item_name_exists, lookup_item_by_id
+from transaction_store import TRANSACTION_COLUMNS, DATE_FORMAT, EPOCH_ORDINAL, parse_time_seconds
+from csv_loader import iter_numbered_csv_columns
+from money import parse_cents
+from transaction_journal import TransactionJournal, journal_path_for
+from data_files import load_csv_data, persist_system_data
+
+
+class RejectsWriter:
+    """Collects rows that failed validation, with their line number and the reason, in one CSV."""
+
+    def __init__(self, rejects_file):
+        self.rejects_file = rejects_file
+        self.file_stream = None
+        self.count = 0
+
+    def reject(self, source_file, line_number, columns, values, reason):
+        if self.file_stream is None:
+            self.file_stream = open(self.rejects_file, 'w', newline='', encoding='utf-8')
+            self.csv_writer = csv.writer(self.file_stream)
+            self.csv_writer.writerow(['source', 'line', 'reason', 'row'])
+        self.csv_writer.writerow([source_file, line_number, reason,
+                                  ','.join(f"{column}={value}" for column, value in zip(columns, values))])
+        self.count += 1
+
+    def close(self):
+        if self.file_stream is not None:
+            self.file_stream.close()
+
+
+def import_products(products_file, inventory_records, rejects):
+    """Adds new products with the checks register_new_item applies: a unique name, a positive
+    price and a non-negative whole stock. Rows without an id get the next free one."""
+    imported = 0
+    with open(products_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
+        for line_number, values in iter_numbered_csv_columns(file_stream, INVENTORY_COLUMNS):
+            item_id, item_name, price_str, stock_str = values
+            try:
+                if not item_name:
+                    raise ValueError("product name is required")
+                if item_name_exists(inventory_records, item_name):
+                    raise ValueError(f"a product named '{item_name}' already exists")
+                if item_id and lookup_item_by_id(inventory_records, item_id):
+                    raise ValueError(f"product ID '{item_id}' already exists")
+                unit_price = parse_cents(price_str)
+                if unit_price <= 0:
+                    raise ValueError("price must be positive")
+                initial_stock = int(stock_str)
+                if initial_stock < 0:
+                    raise ValueError("stock cannot be negative")
+            except (ValueError, TypeError) as err:
+                rejects.reject(products_file, line_number, INVENTORY_COLUMNS, values, err)
+                continue
+            inventory_records.append(Product(item_id or generate_next_item_id(inventory_records),
+                                             item_name, unit_price, initial_stock))
+            imported += 1
+    return imported
+
+
+def import_sales(sales_file, transaction_records, inventory_records, rejects, check_stock=True):
+    """Streams sales into column buffers, checking each like record_new_transaction does: a known
+    product, a positive whole quantity, a payment that is not negative and (unless check_stock is off)
+    enough stock left after the rows before it. A missing payment is priced at quantity x the current
+    unit price. Stock is
+    decremented once per product at the end and the rows are appended to the store in one step."""
+    day_numbers, seconds, quantities, payment_cents = array('q'), array('i'), array('i'), array('q')
+    product_ids = []
+    remaining_stock = {}
+    parsed_dates, parsed_times, parsed_payments = {}, {}, {}
+    find_item = inventory_records.items_by_id.get  # an InventoryStore, as loaded by load_csv_data
+    with open(sales_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
+        for line_number, values in iter_numbered_csv_columns(file_stream, TRANSACTION_COLUMNS):
+            date_str, time_str, product_id, quantity_str, payment_str = values
+            try:
+                day_number = parsed_dates.get(date_str)
+                if day_number is None:
+                    day_number = datetime.strptime(date_str, DATE_FORMAT).toordinal() - EPOCH_ORDINAL
+                    parsed_dates[date_str] = day_number
+                time_seconds = parsed_times.get(time_str)
+                if time_seconds is None:
+                    time_seconds = parse_time_seconds(time_str)
+                    parsed_times[time_str] = time_seconds
+                item = find_item(product_id)
+                if item is None:
+                    raise ValueError(f"product ID '{product_id}' not found in inventory")
+                quantity = int(quantity_str)
+                if quantity <= 0:
+                    raise ValueError("quantity must be greater than zero")
+                available_quantity = remaining_stock.get(item.id, item.stock)
+                if check_stock and quantity > available_quantity:
+                    raise ValueError(f"stock insufficient ({available_quantity} left)")
+                if payment_str:
+                    cents = parsed_payments.get(payment_str)
+                    if cents is None:
+                        cents = parsed_payments[payment_str] = parse_cents(payment_str)
+                    if cents < 0:
+                        raise ValueError("payment cannot be negative")
+                else:
+                    cents = quantity * item.price
+            except (ValueError, TypeError, AttributeError) as err:
+                rejects.reject(sales_file, line_number, TRANSACTION_COLUMNS, values, err)
+                continue
+            remaining_stock[item.id] = available_quantity - quantity
+            day_numbers.append(day_number)
+            seconds.append(time_seconds)
+            product_ids.append(item.id)
+            quantities.append(quantity)
+            payment_cents.append(cents)
+
+    transaction_records.extend_columns(day_numbers, seconds, product_ids, quantities, payment_cents)
+    for item_id, stock in remaining_stock.items():
+        find_item(item_id).stock = max(stock, 0)
+    return len(day_numbers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import product and sales batches into the shop data files.")
+    parser.add_argument('transactions_file')
+    parser.add_argument('inventory_file')
+    parser.add_argument('--products', help="CSV of new products: id (optional), name, price, stock")
+    parser.add_argument('--sales', help="CSV of sales: date, time, id, quantity, payment (optional)")
+    parser.add_argument('--rejects', default='rejects.csv', help="where rows that fail validation are written")
+    parser.add_argument('--no-stock-check', action='store_true',
+                        help="accept historical sales even when they exceed the current stock")
+    parser.add_argument('--dry-run', action='store_true', help="validate and report without saving")
+    args = parser.parse_args()
+    if not args.products and not args.sales:
+        parser.error("nothing to import: give --products and/or --sales")
+
+    # history_start=date.max leaves any sales archive unread: the save rewrites only the CSV rows.
+    transaction_records, inventory_records = load_csv_data(
+        args.transactions_file, args.inventory_file, history_start=date.max
+    )
+    rejects = RejectsWriter(args.rejects)
+    started = time.perf_counter()
+    try:
+        if args.products:
+            imported = import_products(args.products, inventory_records, rejects)
+            print(f"Products imported: {imported}")
+        if args.sales:
+            imported = import_sales(args.sales, transaction_records, inventory_records, rejects,
+                                    check_stock=not args.no_stock_check)
+            elapsed = time.perf_counter() - started
+            print(f"Sales imported: {imported} ({imported / elapsed if elapsed else 0:,.0f} rows/s)")
+    except OSError as err:
+        print(f"Import failed: {err}")
+        sys.exit(1)
+    finally:
+        rejects.close()
+    if rejects.count:
+        print(f"Rows rejected: {rejects.count} (see '{args.rejects}')")
+    if args.dry_run:
+        print("Dry run: nothing was saved.")
+        return
+
+    # Compaction writes both files in full and folds in any pending journal in the same atomic swap.
+    journal = TransactionJournal(journal_path_for(args.transactions_file))
+    if journal.compact(args.transactions_file, args.inventory_file,
+                       lambda transactions_path, inventory_path: persist_system_data(
+                           transactions_path, inventory_path, transaction_records, inventory_records)):
+        print(f"Saved to '{args.transactions_file}' and '{args.inventory_file}'.")
+    else:
+        print("Saving failed; the data files were left unchanged.")
+    journal.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import os
+import sys
+import csv
+import hmac
+import time
+import getpass
+import hashlib
+import secrets
+import argparse
+
+from csv_loader import iter_csv_records
+
+CREDENTIAL_COLUMNS = ['username', 'password_hash', 'type']
+ROLES = ('assistant', 'manager')
+# scrypt cost: about 16 MB and tens of milliseconds per check, paid once per login rather than per request.
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 14, 8, 1
+SESSION_LIFETIME = 8 * 3600
+REFRESH_INTERVAL = 1.0  # seconds between checks of the file for changes made elsewhere
+_dummy_hash = None
+
+
+def hash_password(password, salt=None, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """Returns 'scrypt$n$r$p$salt$hash' with a fresh random salt unless one is given."""
+    salt = salt or secrets.token_bytes(16)
+    derived = hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=64 * 1024 * 1024)
+    return f"scrypt${n}${r}${p}${salt.hex()}${derived.hex()}"
+
+
+def dummy_hash():
+    """A hash of a random password, made on the first failed lookup rather than at startup."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_hex(8))
+    return _dummy_hash
+
+
+def check_password(password, password_hash):
+    try:
+        scheme, n, r, p, salt_hex, _ = password_hash.split('$')
+        if scheme != 'scrypt':
+            return False
+        expected = hash_password(password, bytes.fromhex(salt_hex), int(n), int(r), int(p))
+    except (ValueError, AttributeError):
+        return False
+    return hmac.compare_digest(expected, password_hash)
+
+
+class CredentialStore:
+    """Salted scrypt password hashes from the credentials CSV, indexed by username.
+
+    A file still holding plaintext passwords is rewritten with hashes on first load.
+    The file is re-read when it changes on disk, so users added or removed by the
+    command line below take effect in a running till or service without a restart.
+    Successful logins get a session token; checking a token is a dict lookup.
+    """
+
+    def __init__(self, credentials_file, session_lifetime=SESSION_LIFETIME):
+        self.credentials_file = credentials_file
+        self.session_lifetime = session_lifetime
+        self.users = {}  # username -> (password hash, role)
+        self.sessions = {}  # token -> (username, (password hash, role) at login, expiry time)
+        self.loaded_signature = None
+        self.last_refresh_time = time.monotonic()
+        self.load()
+
+    def __len__(self):
+        return len(self.users)
+
+    def __contains__(self, username):
+        return username in self.users
+
+    def file_signature(self):
+        file_stat = os.stat(self.credentials_file)
+        return file_stat.st_size, file_stat.st_mtime_ns
+
+    def load(self):
+        users, migrated = {}, False
+        with open(self.credentials_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
+            for entry in iter_csv_records(file_stream, CREDENTIAL_COLUMNS + ['password']):
+                username = entry.get('username')
+                if not username:
+                    continue
+                password_hash = entry.get('password_hash')
+                if not password_hash:
+                    password_hash = hash_password(entry.get('password') or '')
+                    migrated = True
+                users[username] = (password_hash, entry.get('type'))
+        self.users = users
+        if migrated:
+            self.save()
+            print(f"Plaintext passwords in '{self.credentials_file}' have been replaced with salted hashes.")
+        self.loaded_signature = self.file_signature()
+        self.drop_stale_sessions()
+
+    def refresh(self, force=True):
+        """Re-reads the file if another process changed it since it was loaded."""
+        now = time.monotonic()
+        if not force and now - self.last_refresh_time < REFRESH_INTERVAL:
+            return
+        self.last_refresh_time = now
+        try:
+            if self.file_signature() != self.loaded_signature:
+                self.load()
+        except OSError:
+            pass  # keep serving from the table in memory
+
+    def save(self):
+        temp_file = f"{self.credentials_file}.tmp"
+        with open(temp_file, 'w', newline='', encoding='utf-8') as file_stream:
+            csv_writer = csv.writer(file_stream)
+            csv_writer.writerow(CREDENTIAL_COLUMNS)
+            for username, (password_hash, role) in self.users.items():
+                csv_writer.writerow([username, password_hash, role])
+            file_stream.flush()
+            os.fsync(file_stream.fileno())
+        os.replace(temp_file, self.credentials_file)
+        self.loaded_signature = self.file_signature()
+
+    def add_user(self, username, password, role):
+        self.refresh()
+        if not username or ',' in username:
+            raise ValueError("Username must be non-empty and cannot contain commas.")
+        if username in self.users:
+            raise ValueError(f"User '{username}' already exists.")
+        if role not in ROLES:
+            raise ValueError(f"Role must be one of: {', '.join(ROLES)}.")
+        if not password:
+            raise ValueError("Password cannot be empty.")
+        self.users[username] = (hash_password(password), role)
+        self.save()
+
+    def remove_user(self, username):
+        self.refresh()
+        if username not in self.users:
+            raise ValueError(f"User '{username}' does not exist.")
+        del self.users[username]
+        self.save()
+        self.drop_stale_sessions()
+
+    def verify(self, username, password):
+        """Returns the user's role if the password matches, else None."""
+        self.refresh()
+        password_hash, role = self.users.get(username) or (dummy_hash(), None)
+        # Unknown users still pay one scrypt run so timing does not reveal which names exist.
+        if check_password(password, password_hash) and role is not None:
+            return role
+        return None
+
+    def login(self, username, password):
+        """Checks the password once and returns (token, role), or (None, None)."""
+        role = self.verify(username, password)
+        if role is None:
+            return None, None
+        token = secrets.token_urlsafe(24)
+        self.sessions[token] = (username, self.users[username], time.monotonic() + self.session_lifetime)
+        return token, role
+
+    def session(self, token):
+        """Returns (username, role) for a live session token, else (None, None)."""
+        self.refresh(force=False)
+        session = self.sessions.get(token)
+        if session is None:
+            return None, None
+        username, (_, role), expiry_time = session
+        if time.monotonic() > expiry_time:
+            del self.sessions[token]
+            return None, None
+        return username, role
+
+    def logout(self, token):
+        self.sessions.pop(token, None)
+
+    def drop_stale_sessions(self):
+        """Ends expired sessions and those of users removed or given a new password or role since login."""
+        now = time.monotonic()
+        self.sessions = {
+            token: session for token, session in self.sessions.items()
+            if session[2] >= now and self.users.get(session[0]) == session[1]
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the hashed credentials file.")
+    parser.add_argument('credentials_file', nargs='?', default='users.csv')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    add_parser = subparsers.add_parser('add', help="add a user (prompts for the password)")
+    add_parser.add_argument('username')
+    add_parser.add_argument('role', choices=ROLES)
+    remove_parser = subparsers.add_parser('remove', help="remove a user and end their sessions")
+    remove_parser.add_argument('username')
+    subparsers.add_parser('list', help="list users and roles")
+    subparsers.add_parser('migrate', help="replace plaintext passwords with salted hashes")
+    args = parser.parse_args()
+
+    try:
+        credential_store = CredentialStore(args.credentials_file)
+        if args.command == 'add':
+            password = getpass.getpass("Password: ")
+            if password != getpass.getpass("Repeat password: "):
+                raise ValueError("Passwords do not match.")
+            credential_store.add_user(args.username, password, args.role)
+            print(f"User '{args.username}' added as {args.role}.")
+        elif args.command == 'remove':
+            credential_store.remove_user(args.username)
+            print(f"User '{args.username}' removed.")
+        elif args.command == 'list':
+            for username, (_, role) in credential_store.users.items():
+                print(f"{username:<20} {role}")
+        else:
+            print(f"'{args.credentials_file}' holds {len(credential_store)} users with hashed passwords.")
+    except (OSError, ValueError) as err:
+        print(f"Error: {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import csv
+from operator import itemgetter
+
+
+def normalize_header(header):
+    return header.strip().lower().replace('\ufeff', '')
+
+
+def read_field_positions(csv_reader, required_fields):
+    """Reads the header row once and maps each required field to its column (or None)."""
+    header = next(csv_reader, None)
+    if header is None:
+        return None
+    positions = {}
+    for position, column in enumerate(header):
+        positions.setdefault(normalize_header(column), position)
+    field_positions = [positions.get(field) for field in required_fields]
+    if all(position is None for position in field_positions):
+        return None
+    return field_positions
+
+
+def iter_csv_columns(file_obj, required_fields):
+    """Yields one tuple per data row with the required fields in order; missing values are None."""
+    return iter_reader_columns(csv.reader(file_obj), required_fields)
+
+
+def iter_numbered_csv_columns(file_obj, required_fields):
+    """Like iter_csv_columns, but yields (line number, values); the number is the reader's, so blank lines count."""
+    csv_reader = csv.reader(file_obj)
+    for values in iter_reader_columns(csv_reader, required_fields):
+        yield csv_reader.line_num, values
+
+
+def iter_reader_columns(csv_reader, required_fields):
+    field_positions = read_field_positions(csv_reader, required_fields)
+    if field_positions is None:
+        return
+    # Complete rows take the fast path: one itemgetter call and a C-level strip over the fields.
+    if None not in field_positions:
+        pick_fields = itemgetter(*field_positions) if len(field_positions) > 1 else lambda row: (row[field_positions[0]],)
+        needed_length = max(field_positions) + 1
+    else:
+        pick_fields, needed_length = None, 0
+    strip = str.strip
+    for row in csv_reader:
+        if not row:
+            continue
+        row_length = len(row)
+        if pick_fields is not None and row_length >= needed_length:
+            yield tuple(map(strip, pick_fields(row)))
+            continue
+        yield tuple(
+            row[position].strip() if position is not None and position < row_length else None
+            for position in field_positions
+        )
+
+
+def iter_csv_records(file_obj, required_fields):
+    csv_reader = csv.reader(file_obj)
+    field_positions = read_field_positions(csv_reader, required_fields)
+    if field_positions is None:
+        return
+    present_fields = [(field, position) for field, position in zip(required_fields, field_positions)
+                      if position is not None]
+    for row in csv_reader:
+        if not row:
+            continue
+        row_length = len(row)
+        yield {
+            field: row[position].strip() if position < row_length else None
+            for field, position in present_fields
+        }
@@ -0,0 +1,120 @@
+import os
+import csv
+
+from inventory_manager import InventoryStore, INVENTORY_COLUMNS
+from transaction_store import TransactionStore, DeferredTransactionStore, TRANSACTION_COLUMNS
+from csv_loader import iter_csv_records
+from archive_blocks import SalesArchive, archive_path_for
+from data_snapshot import (
+    load_transaction_snapshot, save_transaction_snapshot,
+    load_inventory_snapshot, save_inventory_snapshot
+)
+from transaction_journal import journal_path_for, replay_journal, finish_interrupted_compaction
+
+
+def persist_system_data(transactions_file, inventory_file, transaction_records, inventory_records):
+    print("\n======")
+    saved = True
+    try:
+        with open(transactions_file, 'w', newline='', encoding='utf-8') as file_stream:
+            csv_writer = csv.writer(file_stream)
+            csv_writer.writerow(TRANSACTION_COLUMNS)
+            csv_writer.writerows(transaction_records.csv_rows())
+            file_stream.flush()
+            os.fsync(file_stream.fileno())
+        print(f"Transaction history written '{transactions_file}'.")
+    except Exception as err:
+        print(f"file save failed: {err}")
+        saved = False
+
+    try:
+        with open(inventory_file, 'w', newline='', encoding='utf-8') as file_stream:
+            csv_writer = csv.DictWriter(file_stream, fieldnames=INVENTORY_COLUMNS)
+            csv_writer.writeheader()
+            csv_writer.writerows(item.as_row() for item in inventory_records)
+            file_stream.flush()
+            os.fsync(file_stream.fileno())
+        print(f"Inventory database written to '{inventory_file}'.")
+    except Exception as err:
+        print(f"Inventory file save failed: {err}")
+        saved = False
+    return saved
+
+def load_transaction_history(transactions_file, use_snapshot=False, aggregation_workers=1, history_start=None):
+    """Sales from the CSV plus the archived months reaching back to history_start (None: all of them).
+
+    Older archive blocks are decompressed later, if a search or report asks for their dates.
+    """
+    transaction_records = TransactionStore()
+    try:
+        if os.path.exists(transactions_file) and os.stat(transactions_file).st_size > 0:
+            snapshot_records = load_transaction_snapshot(transactions_file) if use_snapshot else None
+            if snapshot_records is not None:
+                transaction_records = snapshot_records
+            else:
+                with open(transactions_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
+                    transaction_records = TransactionStore.load_csv(file_stream)
+                if use_snapshot:
+                    save_snapshot_safely(save_transaction_snapshot, transactions_file, transaction_records)
+                if transaction_records.unparsed_rows:
+                    print(f"Warning: {len(transaction_records.unparsed_rows)} sales rows could not be parsed and are excluded from searches and reports.")
+    except Exception as err:
+        print(f"Failed to read transactions file '{transactions_file}': {err}. Starting with no transactions.")
+    archive_file = archive_path_for(transactions_file)
+    if os.path.exists(archive_file):
+        try:
+            transaction_records.attach_archive(SalesArchive(archive_file), history_start)
+        except Exception as err:
+            print(f"Failed to read sales archive '{archive_file}': {err}. Archived months are excluded from searches and reports.")
+    transaction_records.aggregation_workers = aggregation_workers
+    return transaction_records
+
+def save_snapshot_safely(save_func, data_file, records):
+    try:
+        save_func(data_file, records)
+    except Exception as err:
+        print(f"Could not write snapshot for '{data_file}': {err}")
+
+def load_inventory(inventory_file, use_snapshot=False):
+    inventory_records = InventoryStore()
+    try:
+        if os.path.exists(inventory_file) and os.stat(inventory_file).st_size > 0:
+            snapshot_items = load_inventory_snapshot(inventory_file) if use_snapshot else None
+            if snapshot_items is not None:
+                inventory_records = InventoryStore(snapshot_items)
+            else:
+                with open(inventory_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
+                    inventory_records = InventoryStore(iter_csv_records(file_stream, INVENTORY_COLUMNS))
+                if use_snapshot:
+                    save_snapshot_safely(save_inventory_snapshot, inventory_file, inventory_records)
+        else:
+            print(f"Inventory file '{inventory_file}' not found or is empty. Starting with empty inventory.")
+    except Exception as err:
+        print(f"Failed to read inventory file '{inventory_file}': {err}. Starting with empty inventory.")
+    return inventory_records
+
+def load_csv_data(transactions_file, inventory_file, defer_transactions=False, use_snapshot=False, aggregation_workers=1, history_start=None):
+    """The CSV files plus any journal entries not yet compacted into them."""
+    finish_interrupted_compaction(transactions_file, inventory_file)
+    inventory_records = load_inventory(inventory_file, use_snapshot)
+    if defer_transactions:
+        transaction_records = DeferredTransactionStore(
+            lambda: load_transaction_history(transactions_file, use_snapshot, aggregation_workers, history_start)
+        )
+    else:
+        transaction_records = load_transaction_history(transactions_file, use_snapshot, aggregation_workers, history_start)
+    replay_journal(journal_path_for(transactions_file), transaction_records, inventory_records)
+    return transaction_records, inventory_records
+
+def load_sqlite_data(storage, transactions_file, inventory_file, defer_transactions=False, aggregation_workers=1):
+    """Loads from the database, first importing the CSV files into it if it is new."""
+    if storage.is_empty():
+        transaction_records, inventory_records = load_csv_data(transactions_file, inventory_file)
+        sale_count, product_count = storage.import_records(transaction_records, inventory_records)
+        print(f"Imported {sale_count} sales and {product_count} products into '{storage.database_file}'.")
+    inventory_records = storage.load_inventory()
+    if defer_transactions:
+        transaction_records = DeferredTransactionStore(lambda: storage.load_transactions(aggregation_workers))
+    else:
+        transaction_records = storage.load_transactions(aggregation_workers)
+    return transaction_records, inventory_records
@@ -0,0 +1,95 @@
+import os
+import json
+import numpy as np
+
+from transaction_store import TransactionStore
+
+SNAPSHOT_FORMAT = 1
+TRANSACTION_ARRAYS = ['day_numbers', 'seconds', 'product_codes', 'quantities', 'payment_cents', 'product_ids']
+INVENTORY_FIELDS = ['id', 'name', 'price', 'stock']
+
+
+def snapshot_dir_for(data_file):
+    return f"{data_file}.snapshot"
+
+
+def source_signature(data_file):
+    file_stat = os.stat(data_file)
+    return {'source_size': file_stat.st_size, 'source_mtime_ns': file_stat.st_mtime_ns, 'format': SNAPSHOT_FORMAT}
+
+
+def read_manifest(data_file):
+    """Returns the snapshot manifest if the snapshot was taken from the current version of data_file."""
+    manifest_file = os.path.join(snapshot_dir_for(data_file), 'manifest.json')
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as file_stream:
+            manifest = json.load(file_stream)
+        signature = source_signature(data_file)
+    except (OSError, ValueError):
+        return None
+    if any(manifest.get(key) != value for key, value in signature.items()):
+        return None
+    return manifest
+
+
+def write_snapshot(data_file, arrays, extra_manifest=None):
+    snapshot_dir = snapshot_dir_for(data_file)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    manifest_file = os.path.join(snapshot_dir, 'manifest.json')
+    # The manifest is removed first and written last, so a half-written snapshot is never trusted.
+    if os.path.exists(manifest_file):
+        os.remove(manifest_file)
+    for name, values in arrays.items():
+        temp_file = os.path.join(snapshot_dir, f"{name}.tmp.npy")
+        np.save(temp_file, values)
+        os.replace(temp_file, os.path.join(snapshot_dir, f"{name}.npy"))
+    manifest = source_signature(data_file)
+    manifest.update(extra_manifest or {})
+    with open(manifest_file, 'w', encoding='utf-8') as file_stream:
+        json.dump(manifest, file_stream)
+
+
+def load_transaction_snapshot(transactions_file):
+    manifest = read_manifest(transactions_file)
+    if manifest is None:
+        return None
+    snapshot_dir = snapshot_dir_for(transactions_file)
+    try:
+        arrays = {
+            name: np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode=None if name == 'product_ids' else 'r')
+            for name in TRANSACTION_ARRAYS
+        }
+    except (OSError, ValueError):
+        return None
+    return TransactionStore.from_columns(
+        arrays['day_numbers'], arrays['seconds'], arrays['product_codes'], arrays['quantities'],
+        arrays['payment_cents'], arrays['product_ids'].tolist(), manifest.get('unparsed_rows', [])
+    )
+
+
+def save_transaction_snapshot(transactions_file, transaction_records):
+    write_snapshot(transactions_file, {
+        'day_numbers': transaction_records.dates.view(np.int64),
+        'seconds': transaction_records.seconds,
+        'product_codes': transaction_records.codes,
+        'quantities': transaction_records.quantities,
+        'payment_cents': transaction_records.payment_cents,
+        'product_ids': np.array(transaction_records.product_ids, dtype=str),
+    }, {'unparsed_rows': transaction_records.unparsed_rows})
+
+
+def load_inventory_snapshot(inventory_file):
+    if read_manifest(inventory_file) is None:
+        return None
+    try:
+        items = np.load(os.path.join(snapshot_dir_for(inventory_file), 'items.npy'))
+    except (OSError, ValueError):
+        return None
+    return [dict(zip(INVENTORY_FIELDS, row)) for row in items.tolist()]
+
+
+def save_inventory_snapshot(inventory_file, inventory_records):
+    rows = [tuple(item.as_row()[field] for field in INVENTORY_FIELDS) for item in inventory_records]
+    widths = [max([len(row[position]) for row in rows] + [1]) for position in range(len(INVENTORY_FIELDS))]
+    items = np.array(rows, dtype=[(field, f'U{width}') for field, width in zip(INVENTORY_FIELDS, widths)])
+    write_snapshot(inventory_file, {'items': items})
@@ -0,0 +1,164 @@
+import os
+import sys
+import csv
+import json
+import time
+import types
+import bisect
+import cProfile
+import functools
+import subprocess
+import importlib.util
+
+# Upper bounds of the wall-time histogram buckets, in milliseconds; the last bucket is open-ended.
+HISTOGRAM_BOUNDS_MS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000]
+HISTOGRAM_LABELS = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+
+# How many sales rows a call read from the store, worked out from its arguments and result.
+ROW_COUNTERS = {
+    'MonthlySalesRollup.build': lambda result, args: args[0].size,
+    'TransactionStore.rows_in_date_range': lambda result, args: len(result),
+    'TransactionStore.rows_for_products': lambda result, args: len(result),
+    'TransactionStore.product_sales_totals': lambda result, args: scanned_date_slice(*args),
+}
+
+
+def scanned_date_slice(transaction_records, start_date=None, end_date=None):
+    # product_sales_totals reads the sorted date slice, or every row when the dates are out of order.
+    if not transaction_records.dates_in_order:
+        return transaction_records.size
+    return transaction_records.date_range_count(start_date, end_date)
+
+
+class CallMetrics:
+    __slots__ = ('name', 'calls', 'total_seconds', 'max_seconds', 'rows_scanned', 'histogram')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows_scanned = 0
+        self.histogram = [0] * len(HISTOGRAM_LABELS)
+
+    def add(self, elapsed_seconds):
+        self.calls += 1
+        self.total_seconds += elapsed_seconds
+        self.max_seconds = max(self.max_seconds, elapsed_seconds)
+        self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, elapsed_seconds * 1000)] += 1
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'total_ms': round(self.total_seconds * 1000, 3),
+            'mean_ms': round(self.total_seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'rows_scanned': self.rows_scanned,
+            'histogram': dict(zip(HISTOGRAM_LABELS, self.histogram)),
+        }
+
+
+class Instrumentation:
+    """Opt-in call timing: wraps functions in place, so nothing is wrapped (or slowed) unless installed.
+
+    Rows scanned are counted inclusively: a search's total includes the rows its helpers scanned.
+    """
+
+    def __init__(self, profile_target=None):
+        self.metrics = {}
+        self.active_calls = []
+        self.wrappers = {}  # original function -> its wrapper, shared by every namespace it is bound in
+        self.profile_target = profile_target
+        self.profile_count = 0
+
+    def wrap(self, func, name):
+        wrapper = self.wrappers.get(func)
+        if wrapper is not None:
+            return wrapper
+        record = self.metrics.setdefault(name, CallMetrics(name))
+        row_counter = ROW_COUNTERS.get(name)
+        profile = self.profile_target in (name, func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.active_calls.append(record)
+            started = time.perf_counter()
+            try:
+                if profile:
+                    result = self.profile_call(func, args, kwargs)
+                else:
+                    result = func(*args, **kwargs)
+            finally:
+                record.add(time.perf_counter() - started)
+                self.active_calls.pop()
+            if row_counter is not None:
+                rows = row_counter(result, args)
+                record.rows_scanned += rows
+                for caller_record in self.active_calls:
+                    caller_record.rows_scanned += rows
+            return result
+
+        self.wrappers[func] = wrapper
+        self.wrappers[wrapper] = wrapper
+        return wrapper
+
+    def instrument_module(self, module, source_modules=None):
+        """Wraps the functions bound in `module` that are defined in one of `source_modules`.
+
+        Call this for each module that imported the functions by name as well as for the
+        defining modules, so every call site goes through the same wrapper.
+        """
+        source_modules = set(source_modules or [module.__name__])
+        for attribute, value in list(vars(module).items()):
+            if isinstance(value, types.FunctionType) and value.__module__ in source_modules:
+                setattr(module, attribute, self.wrap(value, value.__name__))
+
+    def instrument_class(self, cls, method_names):
+        for method_name in method_names:
+            setattr(cls, method_name, self.wrap(getattr(cls, method_name), f"{cls.__name__}.{method_name}"))
+
+    def profile_call(self, func, args, kwargs):
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            self.profile_count += 1
+            profile_file = f"profile_{func.__name__}_{self.profile_count}.prof"
+            profiler.dump_stats(profile_file)
+            print(f"Profile of {func.__name__} written to '{profile_file}' (view with: python -m pstats {profile_file}).")
+
+    def results(self):
+        return [record.as_dict() for record in sorted(self.metrics.values(), key=lambda r: -r.total_seconds)
+                if record.calls]
+
+    def dump(self, output_file):
+        """Writes the metrics as CSV if the file name ends in .csv, else as JSON."""
+        results = self.results()
+        if output_file.endswith('.csv'):
+            with open(output_file, 'w', newline='', encoding='utf-8') as file_stream:
+                csv_writer = csv.writer(file_stream)
+                csv_writer.writerow(['name', 'calls', 'total_ms', 'mean_ms', 'max_ms', 'rows_scanned'] + HISTOGRAM_LABELS)
+                for result in results:
+                    csv_writer.writerow([result['name'], result['calls'], result['total_ms'], result['mean_ms'],
+                                         result['max_ms'], result['rows_scanned']] + list(result['histogram'].values()))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as file_stream:
+                json.dump({'functions': results}, file_stream, indent=2)
+
+
+def import_times(module_name, top=15):
+    """Imports `module_name` in a fresh interpreter under -X importtime and returns its total import
+    time and the `top` slowest imports as (module, self ms, cumulative ms), slowest first."""
+    # Run from the module's own directory, so it is found even when started from elsewhere.
+    module_dir = os.path.dirname(os.path.abspath(importlib.util.find_spec(module_name).origin))
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+                               capture_output=True, text=True, cwd=module_dir)
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    total_ms = next((cumulative_ms for name, _, cumulative_ms in timings if name == module_name), 0.0)
+    return total_ms, sorted(timings, key=lambda timing: -timing[2])[:top]
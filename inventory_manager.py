@@ -1,81 +1,222 @@
 from datetime import datetime 
 
+from paged_output import show_paged, DEFAULT_PAGE_SIZE
+from money import parse_cents, format_cents
+
+INVENTORY_COLUMNS = ['id', 'name', 'price', 'stock']
+
+
+class Product:
+    """One inventory item with typed fields: price in integer cents, stock as an int.
+
+    CSV strings are converted once by from_row and produced again only by as_row.
+    """
+    __slots__ = ('id', 'name', 'price', 'stock')
+
+    def __init__(self, item_id, name, price=0, stock=0):
+        self.id = item_id
+        self.name = name
+        self.price = price
+        self.stock = stock
+
+    @classmethod
+    def from_row(cls, row):
+        try:
+            price = parse_cents(row.get('price'))
+        except (ValueError, TypeError):
+            price = 0
+        try:
+            stock = int(float(row.get('stock')))
+        except (ValueError, TypeError):
+            stock = 0
+        return cls(str(row.get('id') or ''), row.get('name') or '', price, stock)
+
+    def as_row(self):
+        return {'id': self.id, 'name': self.name, 'price': format_cents(self.price), 'stock': str(self.stock)}
+
+    def __repr__(self):
+        return f"Product({self.id!r}, {self.name!r}, price={self.price}, stock={self.stock})"
+
+
 def extract_item_price(item):
-    try:
-        return float(item.get('price', 0))
-    except (ValueError, TypeError):
-        return 0.0
+    """Unit price in integer cents."""
+    return item.price
 
 def extract_item_stock(item):
-    try:
-        return int(float(item.get('stock', 0))) 
-    except (ValueError, TypeError):
-        return 0
+    return item.stock
+
+def parse_item_id_number(item_id_string):
+    item_id_string = str(item_id_string)
+    if item_id_string.upper().startswith('P') and item_id_string[1:].isdigit():
+        return int(item_id_string[1:])
+    elif item_id_string.isdigit():
+        return int(item_id_string)
+    return None
+
+
+def name_trigrams(normalized_name):
+    return {normalized_name[position:position + 3] for position in range(len(normalized_name) - 2)}
+
+
+class InventoryStore(list):
+    """Inventory list that keeps id, name and trigram indexes in sync with its items."""
+
+    def __init__(self, items=()):
+        super().__init__()
+        self.items_by_id = {}
+        self.items_by_name = {}
+        self.highest_id_value = 0
+        self.normalized_names = []
+        self.trigram_postings = {}  # trigram -> set of positions of items whose name contains it
+        self.stock_forecast = None  # set by TransactionStore.stock_forecast once a restock view is asked for
+        self.extend(items)
+
+    def append(self, item):
+        if not isinstance(item, Product):
+            item = Product.from_row(item)
+        super().append(item)
+        self.index_item(item)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def stock_changed(self, item):
+        """Call after setting an item's stock other than through a sale."""
+        if self.stock_forecast is not None:
+            self.stock_forecast.stock_changed(item.id)
+
+    def index_item(self, item):
+        item_id = item.id
+        self.items_by_id.setdefault(item_id, item)  # first row wins, like the old linear scan
+        self.items_by_name.setdefault(item.name.lower(), []).append(item)
+        id_number = parse_item_id_number(item_id)
+        if id_number is not None:
+            self.highest_id_value = max(self.highest_id_value, id_number)
+        position = len(self.normalized_names)
+        normalized_name = item.name.strip().lower()
+        self.normalized_names.append(normalized_name)
+        for trigram in name_trigrams(normalized_name):
+            self.trigram_postings.setdefault(trigram, set()).add(position)
+
+    def find_by_name(self, normalized_query):
+        """Items whose name contains the query, in catalog order."""
+        query_trigrams = name_trigrams(normalized_query)
+        if not query_trigrams:
+            candidates = range(len(self.normalized_names))
+        else:
+            postings = sorted((self.trigram_postings.get(trigram, set()) for trigram in query_trigrams), key=len)
+            candidates = sorted(postings[0].intersection(*postings[1:]))
+        return [self[position] for position in candidates if normalized_query in self.normalized_names[position]]
+
+    def rank_similar_names(self, normalized_query, limit=5, min_score=0.5):
+        """Items sharing most of the query's trigrams, best first, to suggest matches for typos."""
+        query_trigrams = name_trigrams(normalized_query)
+        if not query_trigrams:
+            return []
+        shared_counts = {}
+        for trigram in query_trigrams:
+            for position in self.trigram_postings.get(trigram, ()):
+                shared_counts[position] = shared_counts.get(position, 0) + 1
+        scored = [
+            (shared / len(query_trigrams), -len(self.normalized_names[position]), -position)
+            for position, shared in shared_counts.items()
+            if shared / len(query_trigrams) >= min_score
+        ]
+        scored.sort(reverse=True)
+        return [self[-negative_position] for _, _, negative_position in scored[:limit]]
+
 
 def lookup_item_by_id(inventory_records, item_id):
+    if isinstance(inventory_records, InventoryStore):
+        return inventory_records.items_by_id.get(str(item_id))
     for item in inventory_records:
-        if str(item.get('id')) == str(item_id):
+        if str(item.id) == str(item_id):
             return item
     return None
 
-def lookup_item_by_name(inventory_records, item_name_query):
+def lookup_item_by_name(inventory_records, item_name_query, fuzzy=False):
     matching_items = []
     normalized_query = item_name_query.strip().lower()
     if not normalized_query:
         return []
+    if isinstance(inventory_records, InventoryStore):
+        if fuzzy:
+            return inventory_records.rank_similar_names(normalized_query)
+        return inventory_records.find_by_name(normalized_query)
+    if fuzzy:
+        return []
 
     for item in inventory_records:
-        item_name = item.get('name', '').lower()
+        item_name = item.name.lower()
         if normalized_query in item_name:
             matching_items.append(item)
     return matching_items
 
 
+def print_name_suggestions(similar_items):
+    if similar_items:
+        print("Did you mean: " + ", ".join(f"{item.name} (ID: {item.id})" for item in similar_items) + "?")
+
+
 def generate_next_item_id(inventory_records):
     if not inventory_records:
         return "1"
-    
+    if isinstance(inventory_records, InventoryStore):
+        return str(inventory_records.highest_id_value + 1)
+
     highest_id_value = 0
     for item in inventory_records:
-        item_id_string = str(item.get('id', ''))
-        try:
-            if item_id_string.upper().startswith('P') and item_id_string[1:].isdigit():
-                highest_id_value = max(highest_id_value, int(item_id_string[1:]))
-            elif item_id_string.isdigit():
-                 highest_id_value = max(highest_id_value, int(item_id_string))
-        except ValueError:
-            pass
+        id_number = parse_item_id_number(item.id)
+        if id_number is not None:
+            highest_id_value = max(highest_id_value, id_number)
     return str(highest_id_value + 1)
 
 
-def show_inventory_catalog(inventory_records):
-    """Displays the current inventory catalog."""
+def item_name_exists(inventory_records, item_name):
+    if isinstance(inventory_records, InventoryStore):
+        return item_name.lower() in inventory_records.items_by_name
+    return any(item.name.lower() == item_name.lower() for item in inventory_records)
+
+
+def format_catalog_line(item):
+    return f"{item.id:<6} {item.name:<25} {item.stock:<8} ${format_cents(item.price):<9}"
+
+def show_inventory_catalog(inventory_records, page_size=DEFAULT_PAGE_SIZE, preview=False):
+    """Displays the current inventory catalog.
+
+    With preview=True only the first page is shown, without a pager prompt, for the
+    catalog listed before a product ID is asked for.
+    """
     print("\n=== Product Catalog ===")
     if not inventory_records:
         print("Catalog is empty - no items available.")
         return
-    print(f"{'ID':<6} {'NAME':<25} {'STOCK':<8} {'PRICE':<10}")
-    print("=" * 60)
-    for item in inventory_records:
-        item_id = item.get('id', 'N/A')
-        item_name = item.get('name', 'Unnamed')
-        item_stock = item.get('stock', '0')
-        item_price = item.get('price', '0.00')
-        print(f"{item_id:<6} {item_name:<25} {item_stock:<8} ${float(item_price):<9.2f}")
-    print("=" * 60)
-
-def register_new_item(inventory_records, generate_next_id_func):
+    row_count = len(inventory_records)
+    footer_line = "=" * 60
+    if preview and row_count > page_size:
+        footer_line += f"\n... and {row_count - page_size} more products (see View Product Catalog)"
+        row_count = page_size
+    show_paged(
+        [f"{'ID':<6} {'NAME':<25} {'STOCK':<8} {'PRICE':<10}", "=" * 60],
+        row_count,
+        lambda start, stop: [format_catalog_line(item) for item in inventory_records[start:stop]],
+        footer_line,
+        page_size
+    )
+
+def register_new_item(inventory_records, generate_next_id_func, journal=None):
     auto_id = generate_next_id_func(inventory_records)
     print(f"System-Generated Product ID: {auto_id}")
     item_name = input("Product Name: ").strip()
     if not item_name:
         print("Product name is required.")
         return
-    if any(item.get('name', '').lower() == item_name.lower() for item in inventory_records):
+    if item_name_exists(inventory_records, item_name):
         print(f"A product with the name '{item_name}' already exists.")
         return
     try:
-        unit_price = float(input("Price per Unit: ").strip())
+        unit_price = parse_cents(input("Price per Unit: ").strip())
         if unit_price <= 0:
             print("Price must be a positive value.")
             return
@@ -90,23 +231,20 @@ def register_new_item(inventory_records, generate_next_id_func):
     except ValueError:
         print("Error")
         return
-    new_inventory_item = {
-        'id': auto_id,
-        'name': item_name,
-        'price': f"{unit_price:.2f}",
-        'stock': str(initial_stock)
-    }
+    new_inventory_item = Product(auto_id, item_name, unit_price, initial_stock)
     inventory_records.append(new_inventory_item)
+    if journal:
+        journal.record_item(new_inventory_item)
     print(f"Product '{item_name}' (ID: {auto_id}) has been registered in the system!")
 
-def modify_item_details(inventory_records, show_catalog_func, lookup_id_func, lookup_name_func):
+def modify_item_details(inventory_records, show_catalog_func, lookup_id_func, lookup_name_func, journal=None):
     print("\n=== Product Details Modification ===")
     
     if not inventory_records:
         print("No products available ")
         return
 
-    show_catalog_func(inventory_records)
+    show_catalog_func(inventory_records, preview=True)
     
     item_identifier = input("Enter Product ID or Name to Modify: ").strip()
     
@@ -118,11 +256,12 @@ def modify_item_details(inventory_records, show_catalog_func, lookup_id_func, lo
         
         if not matching_items_by_name:
             print(f"No product found matching '{item_identifier}' by ID or Name.")
+            print_name_suggestions(lookup_name_func(inventory_records, item_identifier, fuzzy=True))
             return
         elif len(matching_items_by_name) > 1:
             print("Multiple products found matching that name:")
             for idx, item in enumerate(matching_items_by_name):
-                print(f"  {idx + 1}. ID: {item.get('id')}, Name: {item.get('name')}")
+                print(f"  {idx + 1}. ID: {item.id}, Name: {item.name}")
             
             while True:
                 try:
@@ -141,19 +280,19 @@ def modify_item_details(inventory_records, show_catalog_func, lookup_id_func, lo
         print("Could not identify product for modification.")
         return
 
-    print(f"\n--- Modifying: {item_to_modify['name']} (ID: {item_to_modify['id']}) ---")
-    print(f"  Current Price: ${float(item_to_modify.get('price', '0.00')):.2f}")
-    print(f"  Current Stock: {item_to_modify.get('stock', '0')}")
+    print(f"\n--- Modifying: {item_to_modify.name} (ID: {item_to_modify.id}) ---")
+    print(f"  Current Price: ${format_cents(item_to_modify.price)}")
+    print(f"  Current Stock: {item_to_modify.stock}")
 
     updated_price = input("Enter New Price: ").strip()
     if updated_price:
         try:
-            price_value = float(updated_price)
+            price_value = parse_cents(updated_price)
             if price_value <= 0:
                 print("Price must be positive. ")
             else:
-                item_to_modify['price'] = f"{price_value:.2f}"
-                print(f"Price modified to ${item_to_modify['price']}")
+                item_to_modify.price = price_value
+                print(f"Price modified to ${format_cents(item_to_modify.price)}")
         except ValueError:
             print("Invalid price input. ")
             
@@ -164,9 +303,13 @@ def modify_item_details(inventory_records, show_catalog_func, lookup_id_func, lo
             if stock_value < 0:
                 print("Stock quantity must be non-negative.")
             else:
-                item_to_modify['stock'] = str(stock_value)
-                print(f"Stock modified to {item_to_modify['stock']} units")
+                item_to_modify.stock = stock_value
+                if isinstance(inventory_records, InventoryStore):
+                    inventory_records.stock_changed(item_to_modify)
+                print(f"Stock modified to {item_to_modify.stock} units")
         except ValueError:
             print("Invalid stock input. Stock modification cancelled.")
-    
-    print(f"Modification for '{item_to_modify['name']}' complete.")
\ No newline at end of file
+
+    if journal:
+        journal.record_item(item_to_modify)
+    print(f"Modification for '{item_to_modify.name}' complete.")
\ No newline at end of file
@@ -1,6 +1,5 @@
 import sys
-import os 
-import csv
+import time
 from datetime import datetime
 
 from inventory_manager import (
@@ -14,83 +13,45 @@ from transaction_processor import (
     search_transactions_by_product_name_and_date,
     display_overall_monthly_sales_graphs,
     display_product_monthly_sales_graphs,
-    display_product_total_sales_bar_chart
+    display_product_total_sales_bar_chart, display_restock_forecast
 )
-def standardize_csv_data(file_obj, required_fields): #before loading
-    try:
-        csv_reader = csv.DictReader(file_obj)
-        standardized_records = []
-        for entry in csv_reader:
-            sanitized_entry = {}
-            for header, val in entry.items():
-                if header is not None:
-                    processed_header = header.strip().lower().replace('\ufeff', '')
-                    if processed_header in required_fields:
-                        sanitized_entry[processed_header] = val.strip() if isinstance(val, str) else val
-            if any(field in sanitized_entry for field in required_fields):
-                standardized_records.append(sanitized_entry)
-        return standardized_records
-
-    except Exception as err:
-        raise Exception(f"Data standardization failed: {err}")
-
-def persist_system_data(transactions_file, inventory_file, transaction_records, inventory_records):
-    print("\n======")
-    try:
-        transaction_columns = ['date', 'time', 'id', 'quantity', 'payment']
-        with open(transactions_file, 'w', newline='', encoding='utf-8') as file_stream:
-            csv_writer = csv.DictWriter(file_stream, fieldnames=transaction_columns)
-            csv_writer.writeheader()
-            csv_writer.writerows(transaction_records)
-        print(f"Transaction history written '{transactions_file}'.")
-    except Exception as err:
-        print(f"file save failed: {err}")
+import inventory_manager
+import transaction_processor
+import data_files
+from transaction_store import TransactionStore, MonthlySalesRollup
+from instrumentation import Instrumentation, import_times
+from credential_store import CredentialStore
+from data_files import persist_system_data, load_csv_data, load_sqlite_data
+from transaction_journal import TransactionJournal, journal_path_for
+def close_system_data(transactions_file, inventory_file, transaction_records, inventory_records, journal):
+    """Sign-out save: the journal already holds this session's changes, so only
+    sync it, and fold it into the CSV files once it has grown large enough."""
+    journal.sync()
+    if journal.needs_compaction():
+        compacted = journal.compact(
+            transactions_file, inventory_file,
+            lambda transactions_path, inventory_path: persist_system_data(
+                transactions_path, inventory_path, transaction_records, inventory_records
+            )
+        )
+        if compacted:
+            print(f"Journal compacted into '{transactions_file}' and '{inventory_file}'.")
+    else:
+        print(f"\n======\n{journal.entry_count} pending changes saved to journal '{journal.journal_file}'.")
+    journal.close()
+
+def initialize_system_data(transactions_file, inventory_file, credentials_file, defer_transactions=False, use_snapshot=False, aggregation_workers=1, storage=None, history_start=None): #loading the data , #standardize
+    if storage is not None:
+        transaction_records, inventory_records = load_sqlite_data(
+            storage, transactions_file, inventory_file, defer_transactions, aggregation_workers
+        )
+    else:
+        transaction_records, inventory_records = load_csv_data(
+            transactions_file, inventory_file, defer_transactions, use_snapshot, aggregation_workers, history_start
+        )
 
     try:
-        inventory_columns = ['id', 'name', 'price', 'stock']
-        with open(inventory_file, 'w', newline='', encoding='utf-8') as file_stream:
-            csv_writer = csv.DictWriter(file_stream, fieldnames=inventory_columns)
-            csv_writer.writeheader()
-            csv_writer.writerows(inventory_records)
-        print(f"Inventory database written to '{inventory_file}'.")
-    except Exception as err:
-        print(f"Inventory file save failed: {err}")
-
-def initialize_system_data(transactions_file, inventory_file, credentials_file): #loading the data , #standardize
-    transaction_records = []
-    inventory_records = []
-    credential_database = {}
-    
-    TRANSACTION_FIELDS = ['date', 'time', 'id', 'quantity', 'payment'] 
-    INVENTORY_FIELDS = ['id', 'name', 'price', 'stock']
-    CREDENTIAL_FIELDS = ['username', 'password', 'type']
-    try:
-        if os.path.exists(inventory_file) and os.stat(inventory_file).st_size > 0:
-            with open(inventory_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
-                inventory_records = standardize_csv_data(file_stream, INVENTORY_FIELDS)
-        else:
-            print(f"Inventory file '{inventory_file}' not found or is empty. Starting with empty inventory.")
-    except Exception as err:
-        print(f"Failed to read inventory file '{inventory_file}': {err}. Starting with empty inventory.")
-    try:
-        if os.path.exists(transactions_file) and os.stat(transactions_file).st_size > 0:
-            with open(transactions_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
-                transaction_records = standardize_csv_data(file_stream, TRANSACTION_FIELDS)
-    except Exception as err:
-        print(f"Failed to read transactions file '{transactions_file}': {err}. Starting with no transactions.")
-
-    try:
-        with open(credentials_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
-            credential_list = standardize_csv_data(file_stream, CREDENTIAL_FIELDS)
-            for entry in credential_list:
-                username = entry.get('username')
-                if username:
-                    credential_database[username] = {
-                        'password': entry.get('password'), 
-                        'type': entry.get('type')
-                    }
-
-
+        credential_database = CredentialStore(credentials_file)
     except FileNotFoundError:
         print(f"CRITICAL: Credentials file '{credentials_file}' is missing. System cannot start without authentication data.")
         sys.exit(1)
@@ -111,8 +72,8 @@ def authenticate_user(credential_database):
         user_input = input("Username: ").strip()
         pass_input = input("Password: ").strip()
         
-        if ((user_input in credential_database) and (credential_database[user_input]['password'] == pass_input)):
-            access_level = credential_database[user_input]['type']
+        access_level = credential_database.verify(user_input, pass_input)
+        if access_level is not None:
             print(f"\nAuthentication successful! Greetings, {user_input} [Role: {access_level}].")
             return user_input, access_level
         else:
@@ -121,7 +82,7 @@ def authenticate_user(credential_database):
     print("Login attempt limit exceeded. Exiting system.")
     sys.exit(0)
 
-def staff_interface(transaction_records, inventory_records):
+def staff_interface(transaction_records, inventory_records, journal=None):
     while True:
         print("\n╔═════════════════════════════════════╗")
         print("║          STAFF DASHBOARD            ║")
@@ -137,7 +98,7 @@ def staff_interface(transaction_records, inventory_records):
         selection = input("Select option: ").strip()
         
         if selection == '1':
-            record_new_transaction(transaction_records, inventory_records, lookup_item_by_id, extract_item_price, extract_item_stock, show_inventory_catalog)
+            record_new_transaction(transaction_records, inventory_records, lookup_item_by_id, extract_item_price, extract_item_stock, show_inventory_catalog, journal)
         elif selection == '2':
             show_inventory_catalog(inventory_records)
         elif selection == '3':
@@ -151,7 +112,7 @@ def staff_interface(transaction_records, inventory_records):
         else:
             print("Invalid selection.")
 
-def supervisor_interface(transaction_records, inventory_records):
+def supervisor_interface(transaction_records, inventory_records, journal=None):
     while True:
         print("\n╔═════════════════════════════════════╗")
         print("║        SUPERVISOR DASHBOARD         ║")
@@ -166,17 +127,18 @@ def supervisor_interface(transaction_records, inventory_records):
         print("║ 8. Display Overall Monthly Sales    ║")
         print("║ 9. Display Product Monthly Sales    ║")
         print("║ 10. Display Product Total Sales     ║")
-        print("║ 11. Sign Out & Save                 ║")
+        print("║ 11. Restock Forecast                ║")
+        print("║ 12. Sign Out & Save                 ║")
         print("╚═════════════════════════════════════╝")
         
         selection = input("Select option: ").strip()
         
         if selection == '1':
-            record_new_transaction(transaction_records, inventory_records, lookup_item_by_id, extract_item_price, extract_item_stock, show_inventory_catalog)
+            record_new_transaction(transaction_records, inventory_records, lookup_item_by_id, extract_item_price, extract_item_stock, show_inventory_catalog, journal)
         elif selection == '2':
-            register_new_item(inventory_records, generate_next_item_id)
+            register_new_item(inventory_records, generate_next_item_id, journal)
         elif selection == '3':
-            modify_item_details(inventory_records, show_inventory_catalog, lookup_item_by_id, lookup_item_by_name)
+            modify_item_details(inventory_records, show_inventory_catalog, lookup_item_by_id, lookup_item_by_name, journal)
         elif selection == '4':
             show_inventory_catalog(inventory_records)
         elif selection == '5':
@@ -192,36 +154,96 @@ def supervisor_interface(transaction_records, inventory_records):
         elif selection == '10':
             display_product_total_sales_bar_chart(transaction_records, inventory_records, lookup_item_by_id)
         elif selection == '11':
+            display_restock_forecast(transaction_records, inventory_records)
+        elif selection == '12':
             return
         else:
             print("Invalid selection.")
 
 
 
+def install_instrumentation(profile_target=None):
+    """Times every menu action and every inventory and sales function from here on."""
+    instrumentation = Instrumentation(profile_target)
+    source_modules = ['inventory_manager', 'transaction_processor', 'data_files', __name__]
+    for module in (inventory_manager, transaction_processor, data_files, sys.modules[__name__]):
+        instrumentation.instrument_module(module, source_modules)
+    instrumentation.instrument_class(TransactionStore, [
+        'rows_in_date_range', 'filter_rows_by_date', 'rows_for_products', 'product_sales_totals', 'rows'
+    ])
+    instrumentation.instrument_class(MonthlySalesRollup, ['build'])
+    return instrumentation
+
+def show_startup_times(load_seconds):
+    """Prints where the time before the login prompt goes: module imports, then loading the data."""
+    import_ms, slowest_imports = import_times('main_app')
+    print("\n=== Startup Time ===")
+    print(f"{'MODULE':<40} {'SELF ms':>10} {'TOTAL ms':>10}")
+    for module_name, self_ms, cumulative_ms in slowest_imports:
+        print(f"{module_name:<40} {self_ms:>10.1f} {cumulative_ms:>10.1f}")
+    print(f"Imports: {import_ms:.1f} ms, loading data: {load_seconds * 1000:.1f} ms")
+
 def main():
-    if len(sys.argv) != 3:
+    file_arguments = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg.partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    if len(file_arguments) != 2:
+        print("Usage: python main_app.py <sales.csv> <puppy.csv> [--lazy-sales] [--snapshot] [--parallel] "
+              "[--sqlite[=shop.db]] [--history-from=MM/YYYY] [--metrics[=metrics.json|.csv]] [--profile=<function>] "
+              "[--startup-times]")
         sys.exit(1)
-    transactions_file = sys.argv[1]
-    inventory_file = sys.argv[2]
+    transactions_file = file_arguments[0]
+    inventory_file = file_arguments[1]
+    instrumentation = None
+    if '--metrics' in options or '--profile' in options:
+        instrumentation = install_instrumentation(options.get('--profile') or None)
+    storage = None
+    if '--sqlite' in options:
+        from sqlite_storage import SqliteStorage  # sqlite3 is only loaded when the database is used
+        storage = SqliteStorage(options['--sqlite'] or 'shop.db')
+    history_start = None
+    if options.get('--history-from'):
+        try:
+            history_start = datetime.strptime(options['--history-from'], "%m/%Y").date()
+        except ValueError:
+            print("--history-from must be a month as MM/YYYY.")
+            sys.exit(1)
 
+    load_started = time.perf_counter()
     transaction_records, inventory_records, credential_database = initialize_system_data(
         transactions_file, 
         inventory_file, 
-        "users.csv"
+        "users.csv",
+        defer_transactions='--lazy-sales' in options,
+        use_snapshot='--snapshot' in options,
+        aggregation_workers=None if '--parallel' in options else 1,
+        storage=storage,
+        history_start=history_start
     )
+    if '--startup-times' in options:
+        show_startup_times(time.perf_counter() - load_started)
+    # The database commits every change itself, so it stands in for the journal.
+    journal = storage or TransactionJournal(journal_path_for(transactions_file))
     while True:
         user_input, access_level = authenticate_user(credential_database)
         
         if access_level == 'manager':
-            supervisor_interface(transaction_records, inventory_records)
+            supervisor_interface(transaction_records, inventory_records, journal)
         elif access_level == 'assistant':
-            staff_interface(transaction_records, inventory_records)
+            staff_interface(transaction_records, inventory_records, journal)
         else:
             print("Unknown access level. Exiting.")
             sys.exit(1)
 
         print(f"\n>>> Goodbye, {user_input}! <<<")
-        persist_system_data(transactions_file, inventory_file, transaction_records, inventory_records) 
+        if storage:
+            storage.close()
+            print(f"\n======\n{storage.entry_count} changes committed to '{storage.database_file}'.")
+        else:
+            close_system_data(transactions_file, inventory_file, transaction_records, inventory_records, journal)
+        if instrumentation:
+            metrics_file = options.get('--metrics') or 'metrics.json'
+            instrumentation.dump(metrics_file)
+            print(f"Timing metrics written to '{metrics_file}'.")
         break 
 
 if __name__ == "__main__":
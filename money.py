@@ -0,0 +1,27 @@
+"""Money is held as integer cents everywhere inside the system; strings only at the edges."""
+import re
+
+AMOUNT_PATTERN = re.compile(r'[+-]?(\d+(\.\d*)?|\.\d+)', re.ASCII)
+
+
+def parse_cents(amount_str):
+    """Parses a decimal amount like '12.5' or '-3.999' into integer cents, rounding half up.
+
+    Raises ValueError for anything but an optional sign, digits and at most one decimal point.
+    """
+    amount_str = str(amount_str).strip()
+    if not AMOUNT_PATTERN.fullmatch(amount_str):
+        raise ValueError(f"invalid amount: '{amount_str}'")
+    whole, _, fraction = amount_str.partition('.')
+    sign = -1 if whole.startswith('-') else 1
+    fraction = (fraction + '000')[:3]
+    cents = int(whole.lstrip('+-') or '0') * 100 + int(fraction[:2])
+    if int(fraction[2]) >= 5:
+        cents += 1
+    return sign * cents
+
+
+def format_cents(cents):
+    sign = '-' if cents < 0 else ''
+    cents = abs(int(cents))
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
@@ -0,0 +1,41 @@
+import sys
+
+DEFAULT_PAGE_SIZE = 20
+
+
+def show_paged(header_lines, row_count, format_rows_func, footer_line="", page_size=DEFAULT_PAGE_SIZE):
+    """Shows rows one page at a time; `format_rows_func(start, stop)` formats only the visible rows.
+
+    Each page is written to the terminal in a single buffered write.
+    """
+    page_count = max(1, -(-row_count // page_size))
+    page_number = 0
+    while True:
+        start = page_number * page_size
+        lines = list(header_lines)
+        lines.extend(format_rows_func(start, min(start + page_size, row_count)))
+        if footer_line:
+            lines.append(footer_line)
+        if page_count > 1:
+            lines.append(f"Page {page_number + 1}/{page_count} - rows {start + 1}-{min(start + page_size, row_count)} of {row_count}")
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        if page_count == 1:
+            return
+
+        command = input("[Enter/n] next, [p] previous, [page number] jump, [q] quit: ").strip().lower()
+        if command == 'q':
+            return
+        elif command == 'p':
+            page_number = max(0, page_number - 1)
+        elif command.isdigit():
+            if 1 <= int(command) <= page_count:
+                page_number = int(command) - 1
+            else:
+                print(f"Page must be between 1 and {page_count}.")
+        elif command in ('', 'n'):
+            if page_number == page_count - 1:
+                return
+            page_number += 1
+        else:
+            print("Invalid choice.")
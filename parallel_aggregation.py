@@ -0,0 +1,136 @@
+import os
+import numpy as np
+
+# Below this many rows a process pool costs more to start than it saves.
+PARALLEL_MIN_ROWS = 1_000_000
+# Months are offset so (product code, month) packs into one non-negative int64 key.
+MONTH_KEY_OFFSET = 1 << 31
+
+
+def worker_count(workers):
+    return (os.cpu_count() or 1) if workers is None else max(1, workers)
+
+
+def chunk_bounds(start, stop, chunk_count):
+    edges = np.linspace(start, stop, chunk_count + 1).astype(np.int64).tolist()
+    return [(low, high) for low, high in zip(edges[:-1], edges[1:]) if high > low]
+
+
+def mapped_file(column):
+    """Returns the .npy file behind a memory-mapped column, so workers can map it themselves."""
+    base = column
+    while base is not None and not isinstance(base, np.memmap):
+        base = getattr(base, 'base', None)
+    if base is None or getattr(base, 'filename', None) is None:
+        return None
+    if base.__array_interface__['data'][0] != column.__array_interface__['data'][0]:
+        return None
+    return base.filename
+
+
+def chunk_sources(columns, bounds):
+    """Yields one source per chunk: file names for mapped columns (nothing copied), array slices otherwise."""
+    file_names = [mapped_file(column) for column in columns]
+    dtypes = [column.dtype.str for column in columns]
+    for low, high in bounds:
+        yield [(file_name, dtype) if file_name else column[low:high]
+               for file_name, dtype, column in zip(file_names, dtypes, columns)], low, high
+
+
+def open_chunk(source, low, high):
+    columns = []
+    for column in source:
+        if isinstance(column, tuple):
+            file_name, dtype = column
+            column = np.load(file_name, mmap_mode='r').view(dtype)[low:high]
+        columns.append(column)
+    return columns
+
+
+def month_keys(dates, codes):
+    months = dates.astype('datetime64[M]').astype(np.int64)
+    return codes.astype(np.int64) * (1 << 32) + (months + MONTH_KEY_OFFSET)
+
+
+def split_month_key(key):
+    return key >> 32, (key & 0xFFFFFFFF) - MONTH_KEY_OFFSET
+
+
+def sum_by_key(keys, value_cents, quantities, counts=None):
+    """Partial sums of value, count and quantity per distinct key, as four parallel arrays."""
+    unique_keys, key_positions = np.unique(keys, return_inverse=True)
+    key_count = len(unique_keys)
+    if counts is None:
+        counts = np.bincount(key_positions, minlength=key_count)
+    else:
+        counts = np.bincount(key_positions, weights=counts, minlength=key_count).astype(np.int64)
+    # Weighted bincount sums in float64, which is exact for totals below 2**53 cents.
+    return (unique_keys,
+            np.bincount(key_positions, weights=value_cents, minlength=key_count).astype(np.int64),
+            counts,
+            np.bincount(key_positions, weights=quantities, minlength=key_count).astype(np.int64))
+
+
+def monthly_chunk(task):
+    source, low, high = task
+    dates, codes, value_cents, quantities = open_chunk(source, low, high)
+    return sum_by_key(month_keys(dates, codes), value_cents, quantities)
+
+
+def product_chunk(task):
+    (source, low, high), first_day, last_day, product_count = task
+    dates, codes, value_cents = open_chunk(source, low, high)
+    in_range = np.ones(len(dates), dtype=bool)
+    if first_day is not None:
+        in_range &= dates >= first_day
+    if last_day is not None:
+        in_range &= dates <= last_day
+    codes = codes[in_range]
+    return (np.bincount(codes, weights=value_cents[in_range], minlength=product_count).astype(np.int64),
+            np.bincount(codes, minlength=product_count))
+
+
+def map_chunks(chunk_func, tasks, workers):
+    if len(tasks) == 1:
+        return [chunk_func(tasks[0])]
+    from concurrent.futures import ProcessPoolExecutor  # only paid for by histories big enough to split
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(chunk_func, tasks))
+
+
+def monthly_partials(dates, codes, value_cents, quantities, workers=1):
+    """Sums value, count and quantity per (product, month) key, split across worker processes.
+
+    Each worker reduces its chunk of rows to partial sums; the partials are merged with one more
+    sum_by_key pass, which is small because there are only products x months keys.
+    """
+    row_count = len(dates)
+    workers = worker_count(workers)
+    if workers == 1 or row_count < PARALLEL_MIN_ROWS:
+        return sum_by_key(month_keys(dates, codes), value_cents, quantities)
+    bounds = chunk_bounds(0, row_count, workers * 2)
+    tasks = list(chunk_sources([dates, codes, value_cents, quantities], bounds))
+    partials = map_chunks(monthly_chunk, tasks, workers)
+    return merge_monthly_partials(partials)
+
+
+def merge_monthly_partials(partials):
+    keys, value_cents, counts, quantities = (np.concatenate(parts) for parts in zip(*partials))
+    return sum_by_key(keys, value_cents, quantities, counts=counts)
+
+
+def product_totals(dates, codes, value_cents, product_count, first_day, last_day, low=0, high=None, workers=1):
+    """Sales value (cents) and sale count per product code for dates in [first_day, last_day] (None is open).
+
+    Rows outside [low, high) are skipped; pass the date slice bounds when the dates are sorted.
+    """
+    high = len(dates) if high is None else high
+    workers = worker_count(workers)
+    chunk_count = 1 if workers == 1 or high - low < PARALLEL_MIN_ROWS else workers * 2
+    tasks = [(task, first_day, last_day, product_count)
+             for task in chunk_sources([dates, codes, value_cents], chunk_bounds(low, high, chunk_count))]
+    if not tasks:
+        return np.zeros(product_count, dtype=np.int64), np.zeros(product_count, dtype=np.int64)
+    partials = map_chunks(product_chunk, tasks, workers)
+    return (np.sum([partial[0] for partial in partials], axis=0),
+            np.sum([partial[1] for partial in partials], axis=0))
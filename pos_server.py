@@ -0,0 +1,226 @@
+import json
+import time
+import random
+import getpass
+import signal
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from inventory_manager import lookup_item_by_id, extract_item_price, extract_item_stock, Product
+from transaction_processor import new_sale, commit_sale
+from transaction_journal import TransactionJournal, journal_path_for
+from main_app import initialize_system_data, close_system_data
+
+# Protocol: one JSON object per line in each direction.
+#   {"op": "lookup", "id": "7"}               -> {"ok": true, "item": {...}}
+#   {"op": "sell", "id": "7", "quantity": 2}  -> {"ok": true, "transaction": {...}, "stock": 32}
+#   {"op": "login", "username": "u", "password": "p"} -> {"ok": true, "token": "...", "role": "assistant"}
+#   {"op": "logout", "token": "..."}          -> {"ok": true}
+#   {"op": "ping"}                            -> {"ok": true}
+# Failures come back as {"ok": false, "error": "..."}.
+# Started with --require-login, lookup and sell also need the "token" from a login.
+
+
+class PointOfSaleService:
+    """Sells from shared in-memory stores to many till connections at once."""
+
+    def __init__(self, transaction_records, inventory_records, journal, credential_store=None):
+        self.transaction_records = transaction_records
+        self.inventory_records = inventory_records
+        self.journal = journal
+        self.credential_store = credential_store  # None: no login required
+        self.product_locks = {}
+        # One writer thread keeps journal entries in a single ordered stream off the event loop.
+        self.journal_executor = ThreadPoolExecutor(max_workers=1)
+        self.completed_sales = 0
+
+    def product_lock(self, item_id):
+        lock = self.product_locks.get(item_id)
+        if lock is None:
+            lock = self.product_locks[item_id] = asyncio.Lock()
+        return lock
+
+    def lookup(self, item_id):
+        item = lookup_item_by_id(self.inventory_records, item_id)
+        if not item:
+            return {'ok': False, 'error': f"Item ID '{item_id}' not found in inventory."}
+        return {'ok': True, 'item': item.as_row()}
+
+    async def sell(self, item_id, sold_quantity):
+        item = lookup_item_by_id(self.inventory_records, item_id)
+        if not item:
+            return {'ok': False, 'error': f"Item ID '{item_id}' not found in inventory."}
+        if isinstance(sold_quantity, bool) or not isinstance(sold_quantity, int) or sold_quantity <= 0:
+            return {'ok': False, 'error': "Quantity must be a positive integer."}
+
+        # The per-product lock spans the stock check, the journal write and the decrement, so sales of
+        # one product are checked against the stock its previous sale left and journaled in that order,
+        # while sales of other products carry on. Memory changes only once the journal has the sale.
+        async with self.product_lock(item.id):
+            available_quantity = extract_item_stock(item)
+            if sold_quantity > available_quantity:
+                return {'ok': False, 'error': "Stock insufficient.", 'stock': available_quantity}
+            new_transaction = new_sale(item, sold_quantity, extract_item_price(item))
+            journal_entry_item = Product(item.id, item.name, item.price, available_quantity - sold_quantity)
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    self.journal_executor, self.journal.record_sale, new_transaction, journal_entry_item
+                )
+            except OSError as err:
+                return {'ok': False, 'error': f"Sale not recorded: {err}"}
+            commit_sale(self.transaction_records, item, new_transaction, available_quantity)
+        self.completed_sales += 1
+        return {'ok': True, 'transaction': new_transaction.as_row(), 'stock': extract_item_stock(item)}
+
+    async def login(self, username, password):
+        if self.credential_store is None:
+            return {'ok': False, 'error': "This service does not use logins."}
+        # scrypt is deliberately slow, so it runs off the event loop.
+        token, role = await asyncio.get_running_loop().run_in_executor(
+            None, self.credential_store.login, str(username), str(password)
+        )
+        if token is None:
+            return {'ok': False, 'error': "Authentication failed."}
+        return {'ok': True, 'token': token, 'role': role}
+
+    async def handle_request(self, request):
+        op = request.get('op')
+        if op == 'login':
+            return await self.login(request.get('username', ''), request.get('password', ''))
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'logout':
+            if self.credential_store is not None:
+                self.credential_store.logout(request.get('token'))
+            return {'ok': True}
+        if self.credential_store is not None and self.credential_store.session(request.get('token'))[0] is None:
+            return {'ok': False, 'error': "Login required."}
+        if op == 'sell':
+            return await self.sell(str(request.get('id', '')).strip(), request.get('quantity'))
+        if op == 'lookup':
+            return self.lookup(str(request.get('id', '')).strip())
+        return {'ok': False, 'error': f"Unknown operation '{op}'."}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as err:
+                    response = {'ok': False, 'error': f"Malformed request: {err}"}
+                else:
+                    try:
+                        response = await self.handle_request(request)
+                    except (TypeError, ValueError, AttributeError) as err:
+                        response = {'ok': False, 'error': f"Malformed request: {err}"}
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.journal_executor.shutdown(wait=True)
+
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    stop_requested = asyncio.Event()
+    for stop_signal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(stop_signal, stop_requested.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # no signal handlers on Windows; Ctrl+C still raises KeyboardInterrupt
+    print(f"Point-of-sale service listening on {host}:{port}. Press Ctrl+C to stop.")
+    async with server:
+        await stop_requested.wait()
+
+
+async def run_load_client(host, port, product_ids, request_count, results, credentials=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    token = None
+    if credentials:
+        writer.write(json.dumps({'op': 'login', 'username': credentials[0], 'password': credentials[1]}).encode('utf-8') + b'\n')
+        await writer.drain()
+        token = json.loads(await reader.readline()).get('token')
+    latencies = []
+    for _ in range(request_count):
+        request = {'op': 'sell', 'id': random.choice(product_ids), 'quantity': 1, 'token': token}
+        started = time.perf_counter()
+        writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - started)
+        results['sold' if response.get('ok') else 'rejected'] += 1
+    if token:
+        writer.write(json.dumps({'op': 'logout', 'token': token}).encode('utf-8') + b'\n')
+        await writer.drain()
+        await reader.readline()
+    writer.close()
+    results['latencies'].extend(latencies)
+
+
+async def run_load_test(host, port, product_ids, clients, requests_per_client, credentials=None):
+    results = {'sold': 0, 'rejected': 0, 'latencies': []}
+    started = time.perf_counter()
+    await asyncio.gather(*(run_load_client(host, port, product_ids, requests_per_client, results, credentials)
+                           for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(results['latencies'])
+    total = len(latencies)
+    print(f"{total} requests from {clients} clients in {elapsed:.2f}s: {total / elapsed:.0f} requests/s")
+    print(f"Sold: {results['sold']}  Rejected (out of stock or not logged in): {results['rejected']}")
+    if latencies:
+        for label, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+            print(f"  {label} latency: {latencies[min(total - 1, int(total * fraction))] * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-till point-of-sale service and load generator.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help="serve sales from the shop data files")
+    serve_parser.add_argument('transactions_file')
+    serve_parser.add_argument('inventory_file')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--credentials', default='users.csv')
+    serve_parser.add_argument('--require-login', action='store_true', help="tills must log in before lookup and sell")
+    load_parser = subparsers.add_parser('load', help="drive a running service with concurrent tills")
+    load_parser.add_argument('product_ids', nargs='+')
+    load_parser.add_argument('--host', default='127.0.0.1')
+    load_parser.add_argument('--port', type=int, default=8765)
+    load_parser.add_argument('--clients', type=int, default=20)
+    load_parser.add_argument('--requests', type=int, default=500, help="requests per client")
+    load_parser.add_argument('--username', help="log each till in as this user (prompts for the password)")
+    args = parser.parse_args()
+
+    if args.command == 'load':
+        credentials = (args.username, getpass.getpass("Password: ")) if args.username else None
+        asyncio.run(run_load_test(args.host, args.port, args.product_ids, args.clients, args.requests, credentials))
+        return
+
+    transaction_records, inventory_records, credential_store = initialize_system_data(
+        args.transactions_file, args.inventory_file, args.credentials, defer_transactions=True
+    )
+    journal = TransactionJournal(journal_path_for(args.transactions_file))
+    service = PointOfSaleService(transaction_records, inventory_records, journal,
+                                 credential_store if args.require_login else None)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        print(f"\n{service.completed_sales} sales processed.")
+        close_system_data(args.transactions_file, args.inventory_file, transaction_records, inventory_records, journal)
+
+
+if __name__ == "__main__":
+    main()
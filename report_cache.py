@@ -0,0 +1,67 @@
+import functools
+from collections import OrderedDict
+
+
+class ReportCache:
+    """Least-recently-used cache of report results, bounded by entry count and result size.
+
+    Each entry remembers the store generation it was computed at; a lookup at any other
+    generation drops it, so a result is never served after a sale has been added.
+    """
+
+    def __init__(self, max_entries=128, max_cells=500_000):
+        self.max_entries = max_entries
+        self.max_cells = max_cells  # total rows or keys held across all cached results
+        self.entries = OrderedDict()  # key -> (generation, result, cells)
+        self.cells = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, generation):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != generation:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, generation, result, cells=1):
+        if cells > self.max_cells:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (generation, result, cells)
+        self.cells += cells
+        while len(self.entries) > self.max_entries or self.cells > self.max_cells:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        self.cells -= self.entries.pop(key)[2]
+
+
+def cached_report(report_name):
+    """Caches a report function of (transaction_records, *params) in the store's report_cache.
+
+    Cached results are shared between callers, so they must be treated as read-only.
+    """
+    def decorator(report_func):
+        @functools.wraps(report_func)
+        def cached(transaction_records, *args, **kwargs):
+            report_cache = getattr(transaction_records, 'report_cache', None)
+            if report_cache is None:
+                return report_func(transaction_records, *args, **kwargs)
+            key = (report_name, args, tuple(sorted(kwargs.items())))
+            result = report_cache.get(key, transaction_records.generation)
+            if result is None:
+                result = report_func(transaction_records, *args, **kwargs)
+                # Read again: a report that first loads archived history bumps the generation itself.
+                report_cache.put(key, transaction_records.generation, result, max(len(result), 1))
+            return result
+        return cached
+    return decorator
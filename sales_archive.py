@@ -0,0 +1,93 @@
+import os
+import sys
+import shutil
+import argparse
+from datetime import date
+
+import numpy as np
+
+from archive_blocks import CODECS, encode_block, row_columns, month_start_day, archive_path_for
+from data_files import load_csv_data, persist_system_data
+from transaction_store import TransactionStore
+from transaction_journal import TransactionJournal, journal_path_for, compaction_temp_path
+
+
+def archive_closed_months(transactions_file, inventory_file, keep_months=1, codec='lzma'):
+    """Moves the CSV rows of months older than the last `keep_months` into the archive.
+
+    Runs as a journal compaction: the shortened CSV, the inventory and the grown archive are
+    written to temporary files and swapped in together, so a crash leaves either the old or
+    the new layout. Returns (rows archived, blocks written).
+    """
+    transaction_records, inventory_records = load_csv_data(transactions_file, inventory_file, history_start=date.max)
+    today = date.today()
+    cutoff_month = today.year * 12 + today.month - 1 - (keep_months - 1)
+    cutoff_day = month_start_day(cutoff_month // 12, cutoff_month % 12 + 1)
+
+    # history_start=date.max leaves the archive unread, so every row here came from the CSV or journal.
+    day_numbers = transaction_records.dates.view(np.int64)
+    months = transaction_records.dates.astype('datetime64[M]').astype(np.int64)
+    to_archive = day_numbers < cutoff_day
+    remaining = TransactionStore()
+    remaining.extend_columns(*row_columns(transaction_records, np.flatnonzero(~to_archive)))
+    remaining.unparsed_rows = list(transaction_records.unparsed_rows)
+
+    if not to_archive.any():
+        return 0, 0
+    archive_file = archive_path_for(transactions_file)
+    blocks = []
+    for month in np.unique(months[to_archive]).tolist():
+        block_rows = np.flatnonzero(to_archive & (months == month))
+        blocks.append(encode_block(*row_columns(transaction_records, block_rows), codec=codec))
+
+    def write_data_files(transactions_path, inventory_path):
+        archive_temp = compaction_temp_path(archive_file)
+        try:
+            if os.path.exists(archive_file):
+                shutil.copyfile(archive_file, archive_temp)
+            with open(archive_temp, 'ab') as file_stream:
+                for block in blocks:
+                    file_stream.write(block)
+                file_stream.flush()
+                os.fsync(file_stream.fileno())
+        except OSError as err:
+            print(f"Archive write failed: {err}")
+            return False
+        return persist_system_data(transactions_path, inventory_path, remaining, inventory_records)
+
+    journal = TransactionJournal(journal_path_for(transactions_file))
+    try:
+        if not journal.compact(transactions_file, inventory_file, write_data_files):
+            raise OSError("the data files were left unchanged")
+    finally:
+        journal.close()
+    return int(to_archive.sum()), len(blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move closed months of sales into the compressed archive.")
+    parser.add_argument('transactions_file')
+    parser.add_argument('inventory_file')
+    parser.add_argument('--keep-months', type=int, default=1,
+                        help="recent months left in the CSV, counting the current one (default: 1)")
+    parser.add_argument('--codec', choices=sorted(CODECS), default='lzma')
+    args = parser.parse_args()
+    if args.keep_months < 1:
+        parser.error("--keep-months must be at least 1")
+
+    try:
+        archived, block_count = archive_closed_months(args.transactions_file, args.inventory_file,
+                                                      args.keep_months, args.codec)
+    except (OSError, ValueError) as err:
+        print(f"Archiving failed: {err}")
+        sys.exit(1)
+    archive_file = archive_path_for(args.transactions_file)
+    if archived:
+        print(f"Archived {archived} sales in {block_count} monthly blocks to '{archive_file}' "
+              f"({os.path.getsize(archive_file):,} bytes).")
+    else:
+        print("No closed months to archive.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import calendar
+
+import matplotlib.pyplot as plt
+
+
+def finish_chart(fig, output_file=None):
+    if output_file:
+        fig.savefig(output_file)
+        plt.close(fig)
+    else:
+        plt.show()
+
+
+def plot_monthly_sales_chart(monthly_data, count_field, count_label, title, output_file=None):
+    sorted_months = sorted(monthly_data.keys())
+    months_labels = [f"{calendar.month_abbr[m[1]]} {m[0]}" for m in sorted_months]
+    sales_values = [monthly_data[m]['sales_value'] for m in sorted_months]
+    num_sales = [monthly_data[m][count_field] for m in sorted_months]
+
+    fig, ax1 = plt.subplots(figsize=(12, 6))
+
+    ax1.set_xlabel('Month')
+    ax1.set_ylabel('Total Sales Value ($)', color='tab:blue')
+    ax1.plot(months_labels, sales_values, color='tab:blue', marker='o', label='Total Sales Value')
+    ax1.tick_params(axis='y', labelcolor='tab:blue')
+    ax1.tick_params(axis='x', rotation=45)
+
+    ax2 = ax1.twinx()  
+    ax2.set_ylabel(count_label, color='tab:red')  
+    ax2.plot(months_labels, num_sales, color='tab:red', marker='x', linestyle='--', label=count_label)
+    ax2.tick_params(axis='y', labelcolor='tab:red')
+
+    plt.title(title)
+    
+    lines, labels = ax1.get_legend_handles_labels()
+    lines2, labels2 = ax2.get_legend_handles_labels()
+    ax2.legend(lines + lines2, labels + labels2, loc='upper left')
+
+    fig.tight_layout()
+    plt.grid(True, linestyle='--', alpha=0.7)
+    finish_chart(fig, output_file)
+
+
+def plot_product_totals_chart(product_names_and_values, title, output_file=None):
+    sorted_products = sorted(product_names_and_values, key=lambda x: x['value'], reverse=True)
+
+    product_names = [p['name'] for p in sorted_products]
+    total_values = [p['value'] for p in sorted_products]
+
+    fig = plt.figure(figsize=(12, 6))
+    plt.bar(product_names, total_values)
+    plt.xlabel('Product')
+    plt.ylabel('Total Sales Value ($)')
+    plt.title(title)
+    plt.xticks(rotation=45, ha='right')
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    finish_chart(fig, output_file)
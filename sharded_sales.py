@@ -0,0 +1,297 @@
+import os
+import csv
+import sys
+import json
+import hashlib
+import argparse
+from datetime import datetime, date
+
+import numpy as np
+
+from csv_loader import iter_csv_columns
+from transaction_store import TransactionStore, TRANSACTION_COLUMNS, DATE_FORMAT, EPOCH_ORDINAL
+from parallel_aggregation import worker_count, sum_by_key
+from report_cache import ReportCache
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_FORMAT = 1
+DAY_KEY_OFFSET = 1 << 31
+
+
+def shard_month(shard):
+    """The shard's month numbered like datetime64[M], as MonthlySalesRollup numbers them."""
+    year, month = shard['month'].split('-')
+    return (int(year) - 1970) * 12 + int(month) - 1
+
+
+def read_manifest(root_dir):
+    try:
+        with open(os.path.join(root_dir, MANIFEST_FILE), 'r', encoding='utf-8') as file_stream:
+            return json.load(file_stream)
+    except FileNotFoundError:
+        return {'format': MANIFEST_FORMAT, 'shards': [], 'sources': []}
+
+
+def write_manifest(root_dir, manifest):
+    manifest_file = os.path.join(root_dir, MANIFEST_FILE)
+    temp_file = f"{manifest_file}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as file_stream:
+        json.dump(manifest, file_stream, indent=1)
+        file_stream.flush()
+        os.fsync(file_stream.fileno())
+    os.replace(temp_file, manifest_file)
+
+
+def file_digest(data_file):
+    digest = hashlib.sha256()
+    with open(data_file, 'rb') as file_stream:
+        for chunk in iter(lambda: file_stream.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def summarize_shard(shard_file):
+    """Reduces one shard to sums of value, count and quantity per (product, day).
+
+    Runs in a worker process; only the small per-day arrays travel back.
+    """
+    with open(shard_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
+        transaction_records = TransactionStore.load_csv(file_stream)
+    days = transaction_records.dates.view(np.int64)
+    keys = transaction_records.codes.astype(np.int64) * (1 << 32) + (days + DAY_KEY_OFFSET)
+    unique_keys, value_cents, counts, quantities = sum_by_key(
+        keys, transaction_records.payment_cents, transaction_records.quantities
+    )
+    return (transaction_records.product_ids, (unique_keys >> 32).astype(np.int32),
+            (unique_keys & 0xFFFFFFFF) - DAY_KEY_OFFSET, value_cents, counts, quantities)
+
+
+class ShardedMonthlyRollup:
+    """Monthly totals read from the month shards in range, in place of MonthlySalesRollup."""
+
+    def __init__(self, sharded_sales):
+        self.sharded_sales = sharded_sales
+
+    def months_between(self, first_month, last_month, product_code=None):
+        months = {}
+        for shard, summary in self.sharded_sales.summaries(
+                lambda shard: first_month <= shard_month(shard) <= last_month):
+            codes, _, value_cents, counts, quantities = summary
+            selected = slice(None) if product_code is None else codes == product_code
+            if product_code is not None and not selected.any():
+                continue
+            totals = months.setdefault(shard_month(shard), [0, 0, 0])
+            totals[0] += int(value_cents[selected].sum())
+            totals[1] += int(counts[selected].sum())
+            totals[2] += int(quantities[selected].sum())
+        return months
+
+
+class ShardedSales:
+    """Sales partitioned into one CSV per store and month, listed in a manifest.
+
+    Stands in for a TransactionStore in the report functions of transaction_processor;
+    searches still need the sales loaded into a TransactionStore.
+    Shards outside a report's date range are skipped using the manifest alone. The ones
+    in range are reduced to per-product, per-day sums, in parallel when several need
+    reading. The sums are kept until that shard file changes.
+    """
+
+    def __init__(self, root_dir, stores=None, aggregation_workers=1):
+        self.root_dir = root_dir
+        self.stores = set(stores) if stores else None
+        self.aggregation_workers = aggregation_workers
+        self.product_ids = []
+        self.product_codes = {}
+        self.shard_summaries = {}  # shard file -> (file signature, summary with global product codes)
+        self.manifest_signature = None
+        self.shards = []
+        self._generation = 0
+        self.report_cache = ReportCache()
+        self.refresh()
+
+    def refresh(self):
+        """Re-reads the manifest if it changed, e.g. after more sales were split into shards."""
+        try:
+            manifest_stat = os.stat(os.path.join(self.root_dir, MANIFEST_FILE))
+            signature = (manifest_stat.st_size, manifest_stat.st_mtime_ns)
+        except FileNotFoundError:
+            signature = None
+        if signature != self.manifest_signature:
+            self.manifest_signature = signature
+            self.shards = [shard for shard in read_manifest(self.root_dir)['shards']
+                           if self.stores is None or shard['store'] in self.stores]
+            self._generation += 1
+
+    @property
+    def generation(self):
+        self.refresh()
+        return self._generation
+
+    @property
+    def size(self):
+        return sum(shard['rows'] for shard in self.shards)
+
+    def __len__(self):
+        return self.size
+
+    def code_for(self, product_id):
+        product_id = str(product_id)
+        code = self.product_codes.get(product_id)
+        if code is None:
+            code = self.product_codes[product_id] = len(self.product_ids)
+            self.product_ids.append(product_id)
+        return code
+
+    def shard_file(self, shard):
+        return os.path.join(self.root_dir, shard['file'])
+
+    def summaries(self, shard_filter):
+        """Yields (shard, summary) for the shards passing `shard_filter`, reading only uncached ones."""
+        selected = [shard for shard in self.shards if shard_filter(shard)]
+        signatures = {}
+        missing = []
+        for shard in selected:
+            shard_file = self.shard_file(shard)
+            try:
+                file_stat = os.stat(shard_file)
+            except FileNotFoundError:
+                continue
+            signatures[shard_file] = (file_stat.st_size, file_stat.st_mtime_ns)
+            cached = self.shard_summaries.get(shard_file)
+            if cached is None or cached[0] != signatures[shard_file]:
+                missing.append(shard_file)
+        workers = min(worker_count(self.aggregation_workers), len(missing))
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(summarize_shard, missing))
+        else:
+            results = [summarize_shard(shard_file) for shard_file in missing]
+        for shard_file, (local_ids, local_codes, days, value_cents, counts, quantities) in zip(missing, results):
+            global_codes = np.array([self.code_for(product_id) for product_id in local_ids], dtype=np.int32)
+            self.shard_summaries[shard_file] = (signatures[shard_file], (
+                global_codes[local_codes], days, value_cents, counts, quantities
+            ))
+        for shard in selected:
+            cached = self.shard_summaries.get(self.shard_file(shard))
+            if cached is not None:
+                yield shard, cached[1]
+
+    def monthly_rollup(self, start_date=None):
+        # months_between picks the shards in range itself, so start_date is not needed here.
+        return ShardedMonthlyRollup(self)
+
+    def product_sales_totals(self, start_date=None, end_date=None):
+        """Sales value (cents) and sale count per product code, like TransactionStore.product_sales_totals."""
+        first_day = None if start_date is None else start_date.toordinal() - EPOCH_ORDINAL
+        last_day = None if end_date is None else end_date.toordinal() - EPOCH_ORDINAL
+
+        def overlaps(shard):
+            return ((first_day is None or shard['last_day'] >= first_day) and
+                    (last_day is None or shard['first_day'] <= last_day))
+
+        shard_totals = []
+        for _, (codes, days, value_cents, counts, _) in self.summaries(overlaps):
+            in_range = np.ones(len(days), dtype=bool)
+            if first_day is not None:
+                in_range &= days >= first_day
+            if last_day is not None:
+                in_range &= days <= last_day
+            shard_totals.append((codes[in_range], value_cents[in_range], counts[in_range]))
+        product_count = len(self.product_ids)
+        totals = np.zeros(product_count, dtype=np.int64)
+        sale_counts = np.zeros(product_count, dtype=np.int64)
+        for codes, value_cents, counts in shard_totals:
+            np.add.at(totals, codes, value_cents)
+            np.add.at(sale_counts, codes, counts)
+        return totals, sale_counts
+
+
+def split_into_shards(transactions_file, root_dir, store):
+    """Appends the rows of a sales CSV to the store's month shards and updates the manifest.
+
+    The manifest records a digest of every file split in, and a file already split into
+    the store raises ValueError instead of being appended twice. Returns (rows added,
+    rows skipped because their date could not be parsed).
+    """
+    manifest = read_manifest(root_dir)
+    sources = manifest.setdefault('sources', [])
+    digest = file_digest(transactions_file)
+    for source in sources:
+        if source['store'] == store and source['sha256'] == digest:
+            raise ValueError(f"'{transactions_file}' was already split into store '{store}' "
+                             f"(as '{source['file']}'); its rows would be counted twice")
+    shards = {(shard['store'], shard['month']): shard for shard in manifest['shards']}
+    rows_by_month = {}
+    day_numbers = {}
+    skipped = 0
+    with open(transactions_file, 'r', newline='', encoding='utf-8-sig') as file_stream:
+        for values in iter_csv_columns(file_stream, TRANSACTION_COLUMNS):
+            date_str = values[0]
+            day_number = day_numbers.get(date_str)
+            if day_number is None:
+                try:
+                    day_number = datetime.strptime(date_str, DATE_FORMAT).toordinal() - EPOCH_ORDINAL
+                except (ValueError, TypeError):
+                    skipped += 1
+                    continue
+                day_numbers[date_str] = day_number
+            sale_date = date.fromordinal(day_number + EPOCH_ORDINAL)
+            rows_by_month.setdefault(f"{sale_date.year:04d}-{sale_date.month:02d}", []).append((day_number, values))
+
+    os.makedirs(os.path.join(root_dir, store), exist_ok=True)
+    for month, rows in sorted(rows_by_month.items()):
+        relative_file = os.path.join(store, f"{month}.csv")
+        shard_file = os.path.join(root_dir, relative_file)
+        new_file = not os.path.exists(shard_file) or os.stat(shard_file).st_size == 0
+        with open(shard_file, 'a', newline='', encoding='utf-8') as file_stream:
+            csv_writer = csv.writer(file_stream)
+            if new_file:
+                csv_writer.writerow(TRANSACTION_COLUMNS)
+            csv_writer.writerows(values for _, values in rows)
+            file_stream.flush()
+            os.fsync(file_stream.fileno())
+        shard = shards.setdefault((store, month), {
+            'store': store, 'month': month, 'file': relative_file.replace(os.sep, '/'),
+            'rows': 0, 'first_day': rows[0][0], 'last_day': rows[0][0],
+        })
+        shard['rows'] += len(rows)
+        shard['first_day'] = min([shard['first_day']] + [day_number for day_number, _ in rows])
+        shard['last_day'] = max([shard['last_day']] + [day_number for day_number, _ in rows])
+    added = sum(len(rows) for rows in rows_by_month.values())
+    sources.append({'store': store, 'file': os.path.basename(transactions_file), 'sha256': digest, 'rows': added})
+    manifest['format'] = MANIFEST_FORMAT
+    manifest['shards'] = sorted(shards.values(), key=lambda shard: (shard['store'], shard['month']))
+    write_manifest(root_dir, manifest)
+    return added, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition sales CSV files by store and month.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    split_parser = subparsers.add_parser('split', help="append a store's sales CSV to its month shards; each "
+                                         "file is taken once, so split only files of new sales")
+    split_parser.add_argument('transactions_file')
+    split_parser.add_argument('root_dir')
+    split_parser.add_argument('--store', required=True, help="branch name; becomes the shard directory")
+    list_parser = subparsers.add_parser('list', help="show the shards in the manifest")
+    list_parser.add_argument('root_dir')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'split':
+            added, skipped = split_into_shards(args.transactions_file, args.root_dir, args.store)
+            print(f"Added {added} sales to '{args.root_dir}' under store '{args.store}'.")
+            if skipped:
+                print(f"Warning: {skipped} rows with unreadable dates were skipped.")
+        else:
+            for shard in read_manifest(args.root_dir)['shards']:
+                print(f"{shard['store']:<20} {shard['month']:<8} {shard['rows']:>10} rows  {shard['file']}")
+    except (OSError, ValueError) as err:
+        print(f"Error: {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
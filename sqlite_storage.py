@@ -0,0 +1,204 @@
+import os
+import sys
+import sqlite3
+import argparse
+from array import array
+
+from inventory_manager import InventoryStore, Product
+from transaction_store import TransactionStore, EPOCH_ORDINAL, TRANSACTION_COLUMNS
+from archive_blocks import archive_path_for
+from data_files import load_csv_data, persist_system_data
+from transaction_journal import TransactionJournal, journal_path_for, compaction_temp_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    price_cents INTEGER NOT NULL,
+    stock INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales (
+    day INTEGER NOT NULL,
+    seconds INTEGER NOT NULL,
+    product_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    payment_cents INTEGER NOT NULL
+);
+-- Sales rows whose date, time or numbers could not be parsed, kept as read so an export writes them back.
+CREATE TABLE IF NOT EXISTS unparsed_sales (
+    date TEXT,
+    time TEXT,
+    id TEXT,
+    quantity TEXT,
+    payment TEXT
+);
+CREATE INDEX IF NOT EXISTS products_by_id ON products (id);
+CREATE INDEX IF NOT EXISTS sales_by_day ON sales (day, seconds);
+CREATE INDEX IF NOT EXISTS sales_by_product ON sales (product_id, day);
+"""
+
+# Fixed statements with ? parameters: sqlite3 compiles each once and reuses it from its statement cache.
+INSERT_SALE = "INSERT INTO sales (day, seconds, product_id, quantity, payment_cents) VALUES (?, ?, ?, ?, ?)"
+INSERT_PRODUCT = "INSERT INTO products (id, name, price_cents, stock) VALUES (?, ?, ?, ?)"
+# Like InventoryStore, the first product with an id is the one lookups and edits reach.
+UPDATE_PRODUCT = ("UPDATE products SET name = ?, price_cents = ?, stock = ? "
+                  "WHERE rowid = (SELECT min(rowid) FROM products WHERE id = ?)")
+UPDATE_STOCK = "UPDATE products SET stock = ? WHERE rowid = (SELECT min(rowid) FROM products WHERE id = ?)"
+SELECT_SALES = "SELECT day, seconds, product_id, quantity, payment_cents FROM sales ORDER BY rowid"
+SELECT_PRODUCTS = "SELECT id, name, price_cents, stock FROM products ORDER BY rowid"
+INSERT_UNPARSED_SALE = "INSERT INTO unparsed_sales (date, time, id, quantity, payment) VALUES (?, ?, ?, ?, ?)"
+SELECT_UNPARSED_SALES = "SELECT date, time, id, quantity, payment FROM unparsed_sales ORDER BY rowid"
+
+
+def day_number(sale_date):
+    return sale_date.toordinal() - EPOCH_ORDINAL
+
+
+class SqliteStorage:
+    """Shop data kept in one SQLite database instead of the two CSV files.
+
+    Each sale and product edit is its own committed transaction, so it takes the
+    journal's place: signing out writes nothing, and the database never has to be
+    rewritten in full. The database runs in WAL mode, so reports started by another
+    process read a consistent state while the till keeps committing sales.
+    """
+
+    def __init__(self, database_file):
+        self.database_file = database_file
+        self.connection = sqlite3.connect(database_file)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL survives a crash of the program; like the CSV journal's group commit,
+        # only the last few commits before a power loss can be lost.
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.entry_count = 0
+
+    def is_empty(self):
+        return self.connection.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM products) AND NOT EXISTS (SELECT 1 FROM sales) "
+            "AND NOT EXISTS (SELECT 1 FROM unparsed_sales)"
+        ).fetchone()[0] == 1
+
+    def load_transactions(self, aggregation_workers=1):
+        columns = (array('q'), array('i'), [], array('i'), array('q'))
+        cursor = self.connection.execute(SELECT_SALES)
+        while True:
+            batch = cursor.fetchmany(65536)
+            if not batch:
+                break
+            for column, values in zip(columns, zip(*batch)):
+                column.extend(values)
+        transaction_records = TransactionStore()
+        transaction_records.extend_columns(*columns)
+        transaction_records.unparsed_rows = [dict(zip(TRANSACTION_COLUMNS, row))
+                                             for row in self.connection.execute(SELECT_UNPARSED_SALES)]
+        transaction_records.aggregation_workers = aggregation_workers
+        return transaction_records
+
+    def load_inventory(self):
+        return InventoryStore(Product(item_id, name, price_cents, stock)
+                              for item_id, name, price_cents, stock in self.connection.execute(SELECT_PRODUCTS))
+
+    def import_records(self, transaction_records, inventory_records):
+        """Replaces the database contents with the given stores, in a single transaction.
+
+        Returns (sales, products); the sales count includes unparsed rows, which are stored as read.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM sales")
+            self.connection.execute("DELETE FROM unparsed_sales")
+            self.connection.execute("DELETE FROM products")
+            self.connection.executemany(INSERT_PRODUCT, (
+                (item.id, item.name, item.price, item.stock) for item in inventory_records
+            ))
+            self.connection.executemany(INSERT_SALE, zip(
+                transaction_records.dates.view('int64').tolist(), transaction_records.seconds.tolist(),
+                (transaction_records.product_ids[code] for code in transaction_records.codes.tolist()),
+                transaction_records.quantities.tolist(), transaction_records.payment_cents.tolist()
+            ))
+            self.connection.executemany(INSERT_UNPARSED_SALE, (
+                [unparsed_row.get(column) for column in TRANSACTION_COLUMNS]
+                for unparsed_row in transaction_records.unparsed_rows
+            ))
+        return len(transaction_records), len(inventory_records)
+
+    def record_sale(self, transaction, item):
+        with self.connection:
+            self.connection.execute(INSERT_SALE, (day_number(transaction.date), transaction.seconds,
+                                                  transaction.product_id, transaction.quantity,
+                                                  transaction.payment_cents))
+            self.connection.execute(UPDATE_STOCK, (item.stock, item.id))
+        self.entry_count += 1
+
+    def record_item(self, item):
+        with self.connection:
+            if not self.connection.execute(UPDATE_PRODUCT, (item.name, item.price, item.stock, item.id)).rowcount:
+                self.connection.execute(INSERT_PRODUCT, (item.id, item.name, item.price, item.stock))
+        self.entry_count += 1
+
+    def sync(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def export_records(storage, transactions_file, inventory_file):
+    """Replaces the CSV files with the database contents, including every archived month.
+
+    Runs as a journal compaction, so the pending journal is dropped and the sales archive is
+    emptied in the same atomic swap; otherwise their rows would be loaded on top of the export.
+    Returns the number of journal entries dropped, or None if the files were left unchanged.
+    """
+    transaction_records, inventory_records = storage.load_transactions(), storage.load_inventory()
+    archive_file = archive_path_for(transactions_file)
+
+    def write_data_files(transactions_path, inventory_path):
+        if os.path.exists(archive_file):
+            open(compaction_temp_path(archive_file), 'wb').close()  # an empty archive is removed by the swap
+        return persist_system_data(transactions_path, inventory_path, transaction_records, inventory_records)
+
+    journal = TransactionJournal(journal_path_for(transactions_file))
+    dropped_entries = journal.entry_count
+    try:
+        if not journal.compact(transactions_file, inventory_file, write_data_files):
+            return None
+    finally:
+        journal.close()
+    return dropped_entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move shop data between the CSV files and a SQLite database.")
+    parser.add_argument('command', choices=['import', 'export'],
+                        help="import: CSV files into the database (replacing its contents); export: the reverse")
+    parser.add_argument('database_file')
+    parser.add_argument('transactions_file')
+    parser.add_argument('inventory_file')
+    args = parser.parse_args()
+
+    try:
+        storage = SqliteStorage(args.database_file)
+        if args.command == 'import':
+            transaction_records, inventory_records = load_csv_data(args.transactions_file, args.inventory_file)
+            sale_count, product_count = storage.import_records(transaction_records, inventory_records)
+            print(f"Imported {sale_count} sales and {product_count} products into '{args.database_file}'.")
+        else:
+            dropped_entries = export_records(storage, args.transactions_file, args.inventory_file)
+            if dropped_entries is None:
+                print("Export failed; the data files were left unchanged.")
+                sys.exit(1)
+            if dropped_entries:
+                print(f"Dropped {dropped_entries} pending journal entries that the export replaces.")
+        storage.close()
+    except sqlite3.Error as err:
+        print(f"Database error: {err}")
+        sys.exit(1)
+    except OSError as err:
+        print(f"Error: {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
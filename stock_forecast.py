@@ -0,0 +1,95 @@
+import math
+import heapq
+import time
+
+import numpy as np
+
+DEFAULT_HALF_LIFE_DAYS = 14
+SECONDS_PER_DAY = 86400
+
+
+def day_number_now():
+    """Fractional days since 1970-01-01 in local time, the same clock the sales rows are recorded on."""
+    now = time.time()
+    return (now + time.localtime(now).tm_gmtoff) / SECONDS_PER_DAY
+
+
+class StockForecast:
+    """Exponentially weighted sales velocity per product and a min-heap of days until stockout.
+
+    A product's velocity decays with time since its last sale. Every velocity decays at the
+    same rate, so `stock / weight` (weight being the velocity as of the build time) ranks
+    products by days left at any moment, and a heap keyed on it stays ordered as time passes.
+    A sale or stock edit pushes a fresh entry for the product; the one it replaces is skipped
+    when it reaches the top of the heap.
+    """
+
+    def __init__(self, inventory_records, half_life_days=DEFAULT_HALF_LIFE_DAYS, origin_day=None):
+        self.inventory_records = inventory_records
+        self.half_life_days = half_life_days
+        self.time_constant = half_life_days / math.log(2)
+        self.origin_day = day_number_now() if origin_day is None else origin_day
+        self.weights = {}  # product id -> velocity (units/day) at origin_day
+        self.heap = []  # (stock / weight, sequence, product id)
+        self.current_entries = {}  # product id -> sequence number of its live heap entry
+        self.next_sequence = 0
+
+    @classmethod
+    def build(cls, transaction_records, inventory_records, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+        forecast = cls(inventory_records, half_life_days)
+        sale_days = (transaction_records.dates.view(np.int64) + transaction_records.seconds / SECONDS_PER_DAY)
+        decay = np.exp((sale_days - forecast.origin_day) / forecast.time_constant)
+        weights = np.bincount(transaction_records.codes, weights=transaction_records.quantities * decay,
+                              minlength=len(transaction_records.product_ids)) / forecast.time_constant
+        for product_id, weight in zip(transaction_records.product_ids, weights.tolist()):
+            if weight > 0:
+                forecast.weights[product_id] = weight
+                forecast.stock_changed(product_id)
+        return forecast
+
+    def add_sale(self, product_id, quantity, sale_day):
+        """O(1) velocity update plus one O(log n) heap push; call after the item's stock is decremented."""
+        self.weights[product_id] = (self.weights.get(product_id, 0.0) +
+                                    quantity * math.exp((sale_day - self.origin_day) / self.time_constant)
+                                    / self.time_constant)
+        self.stock_changed(product_id)
+
+    def stock_changed(self, product_id):
+        item = self.inventory_records.items_by_id.get(product_id)
+        weight = self.weights.get(product_id)
+        if item is None or not weight:
+            self.current_entries.pop(product_id, None)
+            return
+        self.push(max(item.stock, 0) / weight, product_id)
+        if len(self.heap) > 2 * len(self.current_entries) + 1024:
+            live_entries = [entry for entry in self.heap if self.current_entries.get(entry[2]) == entry[1]]
+            heapq.heapify(live_entries)
+            self.heap = live_entries
+
+    def push(self, key, product_id):
+        self.current_entries[product_id] = self.next_sequence
+        heapq.heappush(self.heap, (key, self.next_sequence, product_id))
+        self.next_sequence += 1
+
+    def decay_factor(self, now_day):
+        return math.exp(-(now_day - self.origin_day) / self.time_constant)
+
+    def restock_needed(self, horizon_days, limit=20, now_day=None):
+        """Returns up to `limit` (item, days left, units per day) expected to run out within
+        `horizon_days`, soonest first, looking only at the top of the heap."""
+        now_day = day_number_now() if now_day is None else now_day
+        decay = self.decay_factor(now_day)
+        results, live_entries = [], []
+        while self.heap and len(results) < limit:
+            key, sequence, product_id = self.heap[0]
+            if key > horizon_days * decay:
+                break
+            heapq.heappop(self.heap)
+            if self.current_entries.get(product_id) != sequence:
+                continue
+            live_entries.append((key, sequence, product_id))
+            results.append((self.inventory_records.items_by_id[product_id], key / decay,
+                            self.weights[product_id] * decay))
+        for entry in live_entries:
+            heapq.heappush(self.heap, entry)
+        return results
@@ -0,0 +1,29 @@
+import pytest
+
+from money import parse_cents, format_cents
+
+
+@pytest.mark.parametrize('amount_str, cents', [
+    ('12.5', 1250),
+    ('12.50', 1250),
+    ('-3.999', -400),
+    ('0.005', 1),
+    ('.5', 50),
+    ('5.', 500),
+    ('+2', 200),
+    (' 7 ', 700),
+    ('0', 0),
+])
+def test_parse_cents(amount_str, cents):
+    assert parse_cents(amount_str) == cents
+
+
+@pytest.mark.parametrize('amount_str', ['', ' ', '.', '-', '+', '1.-5', '+-5', '1. 5', '1_000', '1.2.3', '1e3', 'abc', None])
+def test_parse_cents_rejects_malformed_amounts(amount_str):
+    with pytest.raises(ValueError):
+        parse_cents(amount_str)
+
+
+def test_format_cents_round_trips():
+    for cents in (0, 5, 1250, -400, 123456):
+        assert parse_cents(format_cents(cents)) == cents
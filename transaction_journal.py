@@ -0,0 +1,166 @@
+import os
+import csv
+import time
+
+from inventory_manager import lookup_item_by_id, Product, INVENTORY_COLUMNS
+from transaction_store import TRANSACTION_COLUMNS
+from archive_blocks import archive_path_for
+
+SALE_ENTRY = 'S'
+ITEM_ENTRY = 'I'
+COMPACTION_THRESHOLD = 500
+
+
+def journal_path_for(transactions_file):
+    return f"{transactions_file}.journal"
+
+
+def compaction_temp_path(data_file):
+    return f"{data_file}.compacting"
+
+
+class TransactionJournal:
+    """Append-only log of sales and inventory edits made since the last compaction.
+
+    Every entry is flushed to the OS as soon as it is written, so a crash of the
+    program loses nothing; fsync is batched (group commit) every
+    `group_commit_size` entries or `group_commit_interval` seconds.
+    """
+
+    def __init__(self, journal_file, group_commit_size=8, group_commit_interval=1.0):
+        self.journal_file = journal_file
+        self.group_commit_size = group_commit_size
+        self.group_commit_interval = group_commit_interval
+        self.entry_count = 0
+        if os.path.exists(journal_file):
+            with open(journal_file, 'rb') as file_stream:
+                self.entry_count = sum(1 for _ in file_stream)
+        self.unsynced_entries = 0
+        self.last_sync_time = time.monotonic()
+        self._open()
+
+    def _open(self):
+        self.file_stream = open(self.journal_file, 'a', newline='', encoding='utf-8')
+        self.csv_writer = csv.writer(self.file_stream)
+        if self.file_stream.tell() > 0:
+            with open(self.journal_file, 'rb') as check_stream:
+                check_stream.seek(-1, os.SEEK_END)
+                if check_stream.read(1) != b'\n':
+                    self.file_stream.write('\r\n')  # keep new entries off a torn last line
+
+    def record_sale(self, transaction, item):
+        self.csv_writer.writerow([SALE_ENTRY] + transaction.csv_values())
+        self.csv_writer.writerow(item_entry(item))
+        self._commit(2)
+
+    def record_item(self, item):
+        self.csv_writer.writerow(item_entry(item))
+        self._commit(1)
+
+    def _commit(self, written_entries):
+        self.entry_count += written_entries
+        self.unsynced_entries += written_entries
+        self.file_stream.flush()
+        if (self.unsynced_entries >= self.group_commit_size or
+                time.monotonic() - self.last_sync_time >= self.group_commit_interval):
+            self.sync()
+
+    def sync(self):
+        self.file_stream.flush()
+        os.fsync(self.file_stream.fileno())
+        self.unsynced_entries = 0
+        self.last_sync_time = time.monotonic()
+
+    def close(self):
+        if not self.file_stream.closed:
+            self.sync()
+            self.file_stream.close()
+
+    def needs_compaction(self):
+        return self.entry_count >= COMPACTION_THRESHOLD
+
+    def compact(self, transactions_file, inventory_file, write_data_files_func):
+        """Fold the journal into the base CSV files.
+
+        `write_data_files_func(transactions_path, inventory_path)` must write the full
+        current state and return True on success. The steps are ordered so that
+        finish_interrupted_compaction can always complete or discard a crashed run.
+        """
+        transactions_temp = compaction_temp_path(transactions_file)
+        inventory_temp = compaction_temp_path(inventory_file)
+        # The writer may also leave a new sales archive here; it is swapped in with the CSV files.
+        archive_file = archive_path_for(transactions_file)
+        archive_temp = compaction_temp_path(archive_file)
+        if not write_data_files_func(transactions_temp, inventory_temp):
+            for temp_file in (transactions_temp, inventory_temp, archive_temp):
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+            return False
+        self.close()
+        # Renaming the journal marks the temp files as complete; from here on a restart finishes the swap.
+        os.replace(self.journal_file, compaction_temp_path(self.journal_file))
+        install_archive(archive_temp, archive_file)
+        os.replace(transactions_temp, transactions_file)
+        os.replace(inventory_temp, inventory_file)
+        os.remove(compaction_temp_path(self.journal_file))
+        self.entry_count = 0
+        self._open()
+        return True
+
+
+def install_archive(archive_temp, archive_file):
+    """Swaps in a sales archive written during compaction; an empty one means the archive is dropped."""
+    if not os.path.exists(archive_temp):
+        return
+    if os.path.getsize(archive_temp) == 0:
+        os.remove(archive_temp)
+        if os.path.exists(archive_file):
+            os.remove(archive_file)
+    else:
+        os.replace(archive_temp, archive_file)
+
+
+def item_entry(item):
+    return [ITEM_ENTRY] + [item.as_row()[column] for column in INVENTORY_COLUMNS]
+
+
+def finish_interrupted_compaction(transactions_file, inventory_file):
+    journal_marker = compaction_temp_path(journal_path_for(transactions_file))
+    archive_file = archive_path_for(transactions_file)
+    temp_files = [(compaction_temp_path(data_file), data_file)
+                  for data_file in (transactions_file, inventory_file, archive_file)]
+    if os.path.exists(journal_marker):
+        install_archive(compaction_temp_path(archive_file), archive_file)
+        for temp_file, data_file in temp_files[:2]:
+            if os.path.exists(temp_file):
+                os.replace(temp_file, data_file)
+        os.remove(journal_marker)
+        print("Completed an interrupted journal compaction.")
+    else:
+        for temp_file, _ in temp_files:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+
+def replay_journal(journal_file, transaction_records, inventory_records):
+    if not os.path.exists(journal_file):
+        return 0
+    replayed_entries = 0
+    with open(journal_file, 'r', newline='', encoding='utf-8') as file_stream:
+        for entry in csv.reader(file_stream):
+            if len(entry) == 6 and entry[0] == SALE_ENTRY:
+                transaction_records.append(dict(zip(TRANSACTION_COLUMNS, entry[1:])))
+            elif len(entry) == 5 and entry[0] == ITEM_ENTRY:
+                item_id, name, price, stock = entry[1:]
+                item = lookup_item_by_id(inventory_records, item_id)
+                if item:
+                    updated = Product.from_row({'price': price, 'stock': stock})
+                    item.price, item.stock = updated.price, updated.stock
+                else:
+                    inventory_records.append({'id': item_id, 'name': name, 'price': price, 'stock': stock})
+            else:
+                # A torn final line from a crash mid-write; everything before it is intact.
+                print(f"Warning: Ignoring incomplete journal entry in '{journal_file}'.")
+                continue
+            replayed_entries += 1
+    return replayed_entries
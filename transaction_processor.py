@@ -1,32 +1,110 @@
-from datetime import datetime
-import calendar
+from datetime import datetime, date
 import numpy as np
-import matplotlib.pyplot as plt
 
-def display_transaction_records(transactions, title=""):
+from transaction_store import Sale
+from money import format_cents
+from report_cache import cached_report
+from paged_output import show_paged, DEFAULT_PAGE_SIZE
+from inventory_manager import print_name_suggestions
+
+DEFAULT_RESTOCK_HORIZON_DAYS = 14
+
+def find_transaction_rows(transaction_records, product_ids=None, start_date=None, end_date=None):
+    transaction_records.ensure_history(start_date)
+    has_date_range = start_date is not None or end_date is not None
+    if product_ids is None:
+        if has_date_range:
+            return transaction_records.rows_in_date_range(start_date, end_date)
+        return np.arange(transaction_records.size)
+
+    # Start from whichever index yields fewer rows: the date slice or the products' postings.
+    product_codes = transaction_records.codes_for(product_ids)
+    if has_date_range and (transaction_records.date_range_count(start_date, end_date)
+                           < transaction_records.product_row_count(product_codes)):
+        rows = transaction_records.rows_in_date_range(start_date, end_date)
+        return rows[np.isin(transaction_records.codes[rows], product_codes)]
+    rows = transaction_records.rows_for_products(product_codes)
+    if has_date_range:
+        rows = transaction_records.filter_rows_by_date(rows, start_date, end_date)
+    return rows
+
+def month_number(year, month):
+    return (year - 1970) * 12 + month - 1
+
+@cached_report('monthly_sales')
+def aggregate_monthly_sales(transaction_records, start_year, start_month, end_year, end_month, product_id=None):
+    first_month = month_number(start_year, start_month)
+    last_month = month_number(end_year, end_month)
+    if last_month < first_month:
+        return {}
+    product_code = None
+    if product_id is not None:
+        product_code = transaction_records.code_for(product_id)
+        if product_code is None:
+            return {}
+
+    rollup = transaction_records.monthly_rollup(date(start_year, start_month, 1))
+    monthly_data = {}
+    for month, (value_cents, num_sales, quantity) in rollup.months_between(first_month, last_month, product_code).items():
+        year_offset, month_index = divmod(month, 12)
+        monthly_data[(1970 + year_offset, month_index + 1)] = {
+            'sales_value': value_cents / 100,
+            'num_sales': num_sales,
+            'quantity': quantity,
+        }
+    return monthly_data
+
+@cached_report('product_sales_totals')
+def aggregate_product_sales_totals(transaction_records, start_date, end_date):
+    totals, sale_counts = transaction_records.product_sales_totals(start_date, end_date)
+    return {
+        transaction_records.product_ids[code]: int(totals[code]) / 100
+        for code in np.flatnonzero(sale_counts)
+    }
+
+def summarize_transactions(transactions):
+    if hasattr(transactions, 'totals'):
+        return transactions.totals()
+    return {
+        'count': len(transactions),
+        'quantity': sum(sale.quantity for sale in transactions),
+        'payment_cents': sum(sale.payment_cents for sale in transactions),
+    }
+
+def format_transaction_line(sale):
+    sale_date, sale_time, product_id, quantity, payment = sale.csv_values()
+    return f"{sale_date:<12} {sale_time:<10} {product_id:<9} {quantity:<10} ${payment:<9}"
+
+def display_transaction_records(transactions, title="", summary_only=False, page_size=DEFAULT_PAGE_SIZE):
     print(f"\n=== {title if title else 'Sales Records'} ===")
     if not transactions:
         print("No matching found.")
-        return
-    print(f"{'DATE':<12} {'TIME':<10} {'PROD_ID':<9} {'QUANTITY':<10} {'AMOUNT':<10}")
-    print("=" * 60)
-    for t in transactions:
-        t_date = t.get('date', 'N/A')
-        t_time = t.get('time', 'N/A')
-        t_id = t.get('id', 'N/A')
-        t_qty = t.get('quantity', '0')
-        t_payment = float(t.get('payment', '0.00'))
-        print(f"{t_date:<12} {t_time:<10} {t_id:<9} {t_qty:<10} ${t_payment:<9.2f}")
-    print("=" * 60)
+        return summarize_transactions([])
+    totals = summarize_transactions(transactions)
+    summary_line = f"Total: {totals['count']} sales, {totals['quantity']} units, ${format_cents(totals['payment_cents'])}"
+    if not summary_only and len(transactions) > page_size:
+        summary_only = input(f"{totals['count']} matching sales. Show rows? (Y/n): ").strip().lower() == 'n'
+    if summary_only:
+        print(summary_line)
+        return totals
+
+    show_paged(
+        [f"{'DATE':<12} {'TIME':<10} {'PROD_ID':<9} {'QUANTITY':<10} {'AMOUNT':<10}", "=" * 60],
+        len(transactions),
+        lambda start, stop: [format_transaction_line(t) for t in transactions[start:stop]],
+        "=" * 60 + "\n" + summary_line,
+        page_size
+    )
+    return totals
 
-def record_new_transaction(transaction_records, inventory_records, lookup_item_by_id_func, extract_item_price_func, extract_item_stock_func, show_inventory_catalog_func):
+def record_new_transaction(transaction_records, inventory_records, lookup_item_by_id_func, extract_item_price_func, extract_item_stock_func, show_inventory_catalog_func, journal=None):
     print("\n======")
     
     if not inventory_records:
         print("Database is empty.")
         return
 
-    show_inventory_catalog_func(inventory_records)
+    show_inventory_catalog_func(inventory_records, preview=True)
     item_id = input("\nEnter Product ID to purchase: ").strip()
     item = lookup_item_by_id_func(inventory_records, item_id)
     
@@ -34,11 +112,11 @@ def record_new_transaction(transaction_records, inventory_records, lookup_item_b
         print(f"Item ID '{item_id}' not found in inventory.")
         return
     
-    unit_cost = extract_item_price_func(item)
+    unit_cents = extract_item_price_func(item)
     available_quantity = extract_item_stock_func(item)
     
     try:
-        sold_quantity = int(input(f"Enter quantity to purchase for '{item.get('name')}': ").strip())
+        sold_quantity = int(input(f"Enter quantity to purchase for '{item.name}': ").strip())
         if sold_quantity <= 0:
             print("Quantity must be greater than zero. Transaction terminated.")
             return
@@ -49,27 +127,40 @@ def record_new_transaction(transaction_records, inventory_records, lookup_item_b
     if sold_quantity > available_quantity:
         print(f"Stock insufficient. Transaction terminated.")
         return
-    total_amount = round(sold_quantity * unit_cost, 2)
+    total_cents = sold_quantity * unit_cents
     print(f"\n##### Summary #####")
-    print(f"Item: {item['name']}")
+    print(f"Item: {item.name}")
     print(f"Quantity: {sold_quantity}")
-    print(f"Unit Price: ${unit_cost:.2f}")
-    print(f"Transaction Total (Amount Collected): ${total_amount:.2f}")
+    print(f"Unit Price: ${format_cents(unit_cents)}")
+    print(f"Transaction Total (Amount Collected): ${format_cents(total_cents)}")
+
+    apply_sale(transaction_records, item, sold_quantity, unit_cents, available_quantity, journal)
+    print(f"Transaction recorded successfully! Updated inventory for {item.name}: {item.stock} units remaining.")
 
+def new_sale(item, sold_quantity, unit_cents):
+    """A Sale of the item stamped with the current time; nothing is recorded yet."""
     current_datetime = datetime.now()
-    transaction_date = current_datetime.strftime("%d/%m/%Y") 
-    transaction_time = current_datetime.strftime("%H:%M:%S")
-
-    new_transaction = {
-        'date': transaction_date,
-        'time': transaction_time,
-        'id': item_id,
-        'quantity': str(sold_quantity), 
-        'payment': f"{total_amount:.2f}" 
-    }
+    return Sale(
+        current_datetime.date(),
+        current_datetime.hour * 3600 + current_datetime.minute * 60 + current_datetime.second,
+        item.id,
+        sold_quantity,
+        sold_quantity * unit_cents
+    )
+
+def commit_sale(transaction_records, item, new_transaction, available_quantity):
+    """Adds a sale to the in-memory store and decrements the item's stock."""
+    item.stock = available_quantity - new_transaction.quantity  # before the append, which updates the stock forecast
     transaction_records.append(new_transaction)
-    item['stock'] = str(available_quantity - sold_quantity)
-    print(f"Transaction recorded successfully! Updated inventory for {item['name']}: {item['stock']} units remaining.")
+
+def apply_sale(transaction_records, item, sold_quantity, unit_cents, available_quantity, journal=None):
+    """Records an already validated sale and decrements the item's stock. Prices are integer cents."""
+    new_transaction = new_sale(item, sold_quantity, unit_cents)
+    commit_sale(transaction_records, item, new_transaction, available_quantity)
+    if journal:
+        journal.record_sale(new_transaction, item)
+    return new_transaction
+
 def search_transactions_by_date(transaction_records):
     print("\n##### Search Sales Records by Date #####")
     search_date_input_str = input("Enter date to search (DD/MM/YYYY): ").strip()
@@ -80,11 +171,8 @@ def search_transactions_by_date(transaction_records):
         print("Invalid date format. Please use DD/MM/YYYY.")
         return
     search_date_formatted_for_comparison = search_date_obj.strftime("%d/%m/%Y")
-    matching_transactions = []
-    for t in transaction_records:
-        transaction_date_str = t.get('date') 
-        if transaction_date_str == search_date_formatted_for_comparison:
-            matching_transactions.append(t)
+    matching_rows = find_transaction_rows(transaction_records, start_date=search_date_obj, end_date=search_date_obj)
+    matching_transactions = transaction_records.view(matching_rows)
     display_transaction_records(matching_transactions, f"Sales Records for {search_date_formatted_for_comparison}")
 
 def search_transactions_by_product_name(transaction_records, inventory_records, lookup_item_by_name_func):
@@ -97,11 +185,11 @@ def search_transactions_by_product_name(transaction_records, inventory_records,
     matching_inventory_items = lookup_item_by_name_func(inventory_records, product_name_query)
     if not matching_inventory_items:
         print(f"No products found matching '{product_name_query}'.")
+        print_name_suggestions(lookup_item_by_name_func(inventory_records, product_name_query, fuzzy=True))
         return
-    matching_product_ids = {item['id'] for item in matching_inventory_items}
-    matching_transactions = [
-        t for t in transaction_records if t.get('id') in matching_product_ids
-    ]
+    matching_product_ids = {item.id for item in matching_inventory_items}
+    matching_rows = find_transaction_rows(transaction_records, product_ids=matching_product_ids)
+    matching_transactions = transaction_records.view(matching_rows)
     display_transaction_records(matching_transactions, f"Sales Records for Product Name containing '{product_name_query}'")
 
 def search_transactions_by_product_name_and_date(transaction_records, inventory_records, lookup_item_by_name_func):
@@ -132,22 +220,15 @@ def search_transactions_by_product_name_and_date(transaction_records, inventory_
     
     if not matching_inventory_items and product_name_query:
         print(f"No products found matching '{product_name_query}'. Search cancelled.")
+        print_name_suggestions(lookup_item_by_name_func(inventory_records, product_name_query, fuzzy=True))
         return
     
-    matching_product_ids = {item['id'] for item in matching_inventory_items}
-
-    filtered_transactions = []
-    for t in transaction_records:
-        transaction_date_str = t.get('date') 
-        if transaction_date_str and t.get('id') in matching_product_ids:
-            try:
-                transaction_date_obj = datetime.strptime(transaction_date_str, "%d/%m/%Y").date()
-                
-                if start_date_obj <= transaction_date_obj <= end_date_obj:
-                    filtered_transactions.append(t)
-            except ValueError:
-                print(f"Warning: Skipping transaction with malformed date '{transaction_date_str}' (ID: {t.get('id')}).")
-                pass
+    matching_product_ids = {item.id for item in matching_inventory_items}
+    matching_rows = find_transaction_rows(
+        transaction_records, product_ids=matching_product_ids,
+        start_date=start_date_obj, end_date=end_date_obj
+    )
+    filtered_transactions = transaction_records.view(matching_rows)
     display_transaction_records(
         filtered_transactions, 
         f"Sales for '{product_name_query if product_name_query else 'All Products'}' between {start_date_str} and {end_date_str}"
@@ -171,56 +252,16 @@ def display_overall_monthly_sales_graphs(transaction_records):
     if not transaction_records:
         print("No transactions available to generate graphs.")
         return
-    monthly_data = {}
-    for t in transaction_records:
-        try:
-            transaction_date_str = t.get('date')
-            transaction_date_obj = datetime.strptime(transaction_date_str, "%d/%m/%Y")
-            
-            year = transaction_date_obj.year
-            month = transaction_date_obj.month
-            
-            if (year > start_year or (year == start_year and month >= start_month)) and \
-               (year < end_year or (year == end_year and month <= end_month)):
-                
-                key = (year, month)
-                monthly_data.setdefault(key, {'sales_value': 0.0, 'num_sales': 0})
-                
-                monthly_data[key]['sales_value'] += float(t.get('payment', 0.0))
-                monthly_data[key]['num_sales'] += 1
-        except (ValueError, TypeError):
-            continue
+    monthly_data = aggregate_monthly_sales(transaction_records, start_year, start_month, end_year, end_month)
 
     if not monthly_data:
         print("No sales data found for the specified month range.")
         return
-    sorted_months = sorted(monthly_data.keys())
-    months_labels = [f"{calendar.month_abbr[m[1]]} {m[0]}" for m in sorted_months]
-    sales_values = [monthly_data[m]['sales_value'] for m in sorted_months]
-    num_sales = [monthly_data[m]['num_sales'] for m in sorted_months]
-
-    fig, ax1 = plt.subplots(figsize=(12, 6))
-
-    ax1.set_xlabel('Month')
-    ax1.set_ylabel('Total Sales Value ($)', color='tab:blue')
-    ax1.plot(months_labels, sales_values, color='tab:blue', marker='o', label='Total Sales Value')
-    ax1.tick_params(axis='y', labelcolor='tab:blue')
-    ax1.tick_params(axis='x', rotation=45)
-
-    ax2 = ax1.twinx()  
-    ax2.set_ylabel('Number of Sales', color='tab:red')  
-    ax2.plot(months_labels, num_sales, color='tab:red', marker='x', linestyle='--', label='Number of Sales')
-    ax2.tick_params(axis='y', labelcolor='tab:red')
-
-    plt.title(f'Overall Monthly Sales Performance ({start_month}/{start_year} - {end_month}/{end_year})')
-    
-    lines, labels = ax1.get_legend_handles_labels()
-    lines2, labels2 = ax2.get_legend_handles_labels()
-    ax2.legend(lines + lines2, labels + labels2, loc='upper left')
-
-    fig.tight_layout() 
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.show()
+    from sales_charts import plot_monthly_sales_chart  # matplotlib loads on the first chart, not at startup
+    plot_monthly_sales_chart(
+        monthly_data, 'num_sales', 'Number of Sales',
+        f'Overall Monthly Sales Performance ({start_month}/{start_year} - {end_month}/{end_year})'
+    )
 
 def display_product_monthly_sales_graphs(transaction_records, inventory_records, show_inventory_catalog_func, lookup_item_by_id_func):
     print("\n##### Display Monthly Sales Performance for a Specific Product #####")
@@ -228,69 +269,28 @@ def display_product_monthly_sales_graphs(transaction_records, inventory_records,
     if not inventory_records:
         print("Inventory is empty.")
         return
-    show_inventory_catalog_func(inventory_records)
+    show_inventory_catalog_func(inventory_records, preview=True)
     product_id = input("\nEnter Product ID to analyze: ").strip()
     product = lookup_item_by_id_func(inventory_records, product_id)
     if not product:
         print(f"Product ID '{product_id}' not found.")
         return
-    product_name = product.get('name', f"Product {product_id}")
+    product_name = product.name
     start_year, start_month = get_month_year_input("start")
     end_year, end_month = get_month_year_input("end")
-    monthly_product_data = {}
-
-    for t in transaction_records:
-        try:
-            if t.get('id') == product_id:
-                transaction_date_str = t.get('date')
-                transaction_date_obj = datetime.strptime(transaction_date_str, "%d/%m/%Y") 
-                
-                year = transaction_date_obj.year
-                month = transaction_date_obj.month
-                
-                if (year > start_year or (year == start_year and month >= start_month)) and \
-                   (year < end_year or (year == end_year and month <= end_month)):
-                    
-                    key = (year, month)
-                    monthly_product_data.setdefault(key, {'sales_value': 0.0, 'num_sales': 0})
-                    
-                    monthly_product_data[key]['sales_value'] += float(t.get('payment', 0.0))
-                    monthly_product_data[key]['num_sales'] += int(t.get('quantity', 0)) 
-        except (ValueError, TypeError):
-            continue
+    monthly_product_data = aggregate_monthly_sales(
+        transaction_records, start_year, start_month, end_year, end_month, product_id=product_id
+    )
 
     if not monthly_product_data:
         print(f"No sales data found for '{product_name}' in the specified month range.")
         return
     
-    sorted_months = sorted(monthly_product_data.keys())
-    
-    months_labels = [f"{calendar.month_abbr[m[1]]} {m[0]}" for m in sorted_months]
-    sales_values = [monthly_product_data[m]['sales_value'] for m in sorted_months]
-    num_sales = [monthly_product_data[m]['num_sales'] for m in sorted_months]
-
-    fig, ax1 = plt.subplots(figsize=(12, 6))
-
-    ax1.set_xlabel('Month')
-    ax1.set_ylabel('Total Sales Value ($)', color='tab:blue')
-    ax1.plot(months_labels, sales_values, color='tab:blue', marker='o', label='Total Sales Value')
-    ax1.tick_params(axis='y', labelcolor='tab:blue')
-    ax1.tick_params(axis='x', rotation=45)
-
-    ax2 = ax1.twinx()  
-    ax2.set_ylabel('Total Quantity Sold', color='tab:red')  
-    ax2.plot(months_labels, num_sales, color='tab:red', marker='x', linestyle='--', label='Total Quantity Sold')
-    ax2.tick_params(axis='y', labelcolor='tab:red')
-
-    plt.title(f'Monthly Sales Performance for {product_name} ({start_month}/{start_year} - {end_month}/{end_year})')
-    
-    lines, labels = ax1.get_legend_handles_labels()
-    lines2, labels2 = ax2.get_legend_handles_labels()
-    ax2.legend(lines + lines2, labels + labels2, loc='upper left')
-
-    fig.tight_layout()
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.show()
+    from sales_charts import plot_monthly_sales_chart
+    plot_monthly_sales_chart(
+        monthly_product_data, 'quantity', 'Total Quantity Sold',
+        f'Monthly Sales Performance for {product_name} ({start_month}/{start_year} - {end_month}/{end_year})'
+    )
 
 def display_product_total_sales_bar_chart(transaction_records, inventory_records, lookup_item_by_id_func):
     print("\n=== Display Total Sales Value Per Product (Bar Chart) ===")
@@ -310,43 +310,40 @@ def display_product_total_sales_bar_chart(transaction_records, inventory_records
     except ValueError:
         print("Invalid date format. Please use DD/MM/YYYY. Chart cancelled.")
         return
-    product_sales_totals = {}
-
-    for t in transaction_records:
-        try:
-            transaction_date_str = t.get('date')
-            transaction_date_obj = datetime.strptime(transaction_date_str, "%d/%m/%Y").date()
-            
-            if start_date_obj <= transaction_date_obj <= end_date_obj:
-                product_id = t.get('id')
-                sales_payment = float(t.get('payment', 0.0))
-                
-                product_sales_totals.setdefault(product_id, 0.0)
-                product_sales_totals[product_id] += sales_payment
-        except (ValueError, TypeError):
-            continue
+    product_sales_totals = aggregate_product_sales_totals(transaction_records, start_date_obj, end_date_obj)
 
     if not product_sales_totals:
         print("No sales data found for the specified date range.")
         return
 
+    product_names_and_values = name_product_totals(product_sales_totals, inventory_records, lookup_item_by_id_func)
+    from sales_charts import plot_product_totals_chart
+    plot_product_totals_chart(product_names_and_values, f'Total Sales Value per Product ({start_date_str} - {end_date_str})')
+
+def name_product_totals(product_sales_totals, inventory_records, lookup_item_by_id_func):
     product_names_and_values = []
     for prod_id, total_value in product_sales_totals.items():
         product = lookup_item_by_id_func(inventory_records, prod_id)
-        product_name = product.get('name', f"Unknown Product (ID: {prod_id})") if product else f"Unknown Product (ID: {prod_id})"
+        product_name = product.name if product else f"Unknown Product (ID: {prod_id})"
         product_names_and_values.append({'name': product_name, 'value': total_value})
+    return product_names_and_values
 
-    sorted_products = sorted(product_names_and_values, key=lambda x: x['value'], reverse=True)
-
-    product_names = [p['name'] for p in sorted_products]
-    total_values = [p['value'] for p in sorted_products]
-
-    plt.figure(figsize=(12, 6))
-    plt.bar(product_names, total_values)
-    plt.xlabel('Product')
-    plt.ylabel('Total Sales Value ($)')
-    plt.title(f'Total Sales Value per Product ({start_date_str} - {end_date_str})')
-    plt.xticks(rotation=45, ha='right')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.show()
+def display_restock_forecast(transaction_records, inventory_records, limit=DEFAULT_PAGE_SIZE):
+    print("\n=== Restock Forecast ===")
+    horizon_str = input(f"Show products running out within how many days? [{DEFAULT_RESTOCK_HORIZON_DAYS}]: ").strip()
+    try:
+        horizon_days = float(horizon_str) if horizon_str else DEFAULT_RESTOCK_HORIZON_DAYS
+    except ValueError:
+        print("Invalid number of days.")
+        return
+    forecast = transaction_records.stock_forecast(inventory_records)
+    restock_items = forecast.restock_needed(horizon_days, limit)
+    if not restock_items:
+        print(f"No product is expected to run out within {horizon_days:g} days at its recent sales rate.")
+        return
+    print(f"{'ID':<6} {'NAME':<25} {'STOCK':<8} {'UNITS/DAY':<10} {'DAYS LEFT':<10}")
+    print("=" * 60)
+    for item, days_left, units_per_day in restock_items:
+        print(f"{item.id:<6} {item.name:<25} {item.stock:<8} {units_per_day:<10.2f} {days_left:<10.1f}")
+    print("=" * 60)
+    print(f"Units/day counts a sale {forecast.half_life_days:g} days old at half weight; soonest to run out first.")
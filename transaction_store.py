@@ -0,0 +1,519 @@
+from datetime import datetime, date
+from array import array
+import numpy as np
+
+from csv_loader import iter_csv_columns
+from money import parse_cents, format_cents
+from report_cache import ReportCache
+from stock_forecast import StockForecast, SECONDS_PER_DAY
+from parallel_aggregation import monthly_partials, product_totals, split_month_key
+
+TRANSACTION_COLUMNS = ['date', 'time', 'id', 'quantity', 'payment']
+DATE_FORMAT = "%d/%m/%Y"
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+ARCHIVE_START_DAY = -(1 << 31)  # earlier than any archived sale
+
+
+def parse_time_seconds(time_str):
+    hours, minutes, seconds = (int(part) for part in time_str.split(':'))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def format_time_seconds(total_seconds):
+    total_seconds = int(total_seconds)
+    return f"{total_seconds // 3600:02d}:{total_seconds % 3600 // 60:02d}:{total_seconds % 60:02d}"
+
+
+def to_datetime64(date_obj):
+    return np.datetime64(date_obj, 'D')
+
+
+def month_number_of(date_value):
+    return int(np.datetime64(date_value, 'M').astype(np.int64))
+
+
+class Sale:
+    """One sale with typed fields: a date, seconds since midnight, quantity and payment in cents.
+
+    Strings are parsed once by from_row and produced again only by as_row.
+    """
+    __slots__ = ('date', 'seconds', 'product_id', 'quantity', 'payment_cents')
+
+    def __init__(self, sale_date, seconds, product_id, quantity, payment_cents):
+        self.date = sale_date
+        self.seconds = seconds
+        self.product_id = product_id
+        self.quantity = quantity
+        self.payment_cents = payment_cents
+
+    @classmethod
+    def from_row(cls, row):
+        """Raises ValueError, TypeError or AttributeError for rows that cannot be parsed."""
+        product_id = row.get('id')
+        if product_id is None:
+            raise ValueError("missing product id")
+        return cls(datetime.strptime(row.get('date'), DATE_FORMAT).date(), parse_time_seconds(row.get('time')),
+                   str(product_id), int(row.get('quantity', 0)), parse_cents(row.get('payment', '0')))
+
+    def as_row(self):
+        return dict(zip(TRANSACTION_COLUMNS, self.csv_values()))
+
+    def csv_values(self):
+        return [self.date.strftime(DATE_FORMAT), format_time_seconds(self.seconds), self.product_id,
+                str(self.quantity), format_cents(self.payment_cents)]
+
+    def __repr__(self):
+        return f"Sale({self.date}, {format_time_seconds(self.seconds)}, {self.product_id!r}, {self.quantity}, {self.payment_cents})"
+
+
+class MonthlySalesRollup:
+    """Sales value (cents), transaction count and quantity per month, overall and per product.
+
+    Months are numbered like datetime64[M] (months since January 1970).
+    """
+
+    def __init__(self):
+        self.by_month = {}
+        self.by_product_month = {}
+
+    @classmethod
+    def build(cls, transaction_records):
+        rollup = cls()
+        unique_keys, value_cents, counts, quantities = monthly_partials(
+            transaction_records.dates, transaction_records.codes, transaction_records.payment_cents,
+            transaction_records.quantities, transaction_records.aggregation_workers
+        )
+        for key, cents, count, quantity in zip(unique_keys.tolist(), value_cents.tolist(),
+                                               counts.tolist(), quantities.tolist()):
+            product_code, month = split_month_key(key)
+            rollup.by_product_month.setdefault(product_code, {})[month] = [cents, count, quantity]
+            totals = rollup.by_month.setdefault(month, [0, 0, 0])
+            totals[0] += cents
+            totals[1] += count
+            totals[2] += quantity
+        return rollup
+
+    def add(self, month, product_code, quantity, cents):
+        for table in (self.by_month, self.by_product_month.setdefault(product_code, {})):
+            totals = table.setdefault(month, [0, 0, 0])
+            totals[0] += cents
+            totals[1] += 1
+            totals[2] += quantity
+
+    def months_between(self, first_month, last_month, product_code=None):
+        table = self.by_month if product_code is None else self.by_product_month.get(product_code, {})
+        return {month: totals for month, totals in table.items() if first_month <= month <= last_month}
+
+
+class TransactionStore:
+    """Columnar sales history: parsed once, queried with NumPy masks."""
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._dates = np.empty(capacity, dtype='datetime64[D]')
+        self._seconds = np.empty(capacity, dtype=np.int32)
+        self._product_codes = np.empty(capacity, dtype=np.int32)
+        self._quantities = np.empty(capacity, dtype=np.int32)
+        self._payment_cents = np.empty(capacity, dtype=np.int64)
+        self.product_ids = []
+        self.product_codes = {}
+        # Sales are normally appended in time order, so the date column doubles as a sorted index.
+        # If an out-of-order row arrives, a permutation is built lazily on the next range query.
+        self.dates_in_order = True
+        self._date_order = None
+        self._sorted_dates = None  # the dates in _date_order, built with it
+        # Rows whose fields could not be parsed are kept verbatim so a save does not drop them.
+        self.unparsed_rows = []
+        self._monthly_rollup = None
+        self._product_postings = None  # product code -> array of row offsets, built on first use
+        self._stock_forecast = None
+        # Closed months live in a compressed SalesArchive; its blocks are read in as queries reach back
+        # to them and kept as the first `archived_rows` rows, which a save leaves out of the CSV.
+        self.archive = None
+        self.archive_from_day = None  # blocks ending on or after this day are loaded; None: none yet
+        self.archived_rows = 0
+        # Worker processes for full-history aggregations; None means one per core.
+        self.aggregation_workers = 1
+        # Bumped on every append, so report results cached at an older generation are discarded.
+        self.generation = 0
+        self.report_cache = ReportCache()
+
+    @classmethod
+    def from_columns(cls, day_numbers, seconds, product_codes, quantities, payment_cents, product_ids, unparsed_rows=()):
+        store = cls(capacity=0)
+        store._dates = np.asarray(day_numbers, dtype=np.int64).view('datetime64[D]')
+        store._seconds = np.asarray(seconds, dtype=np.int32)
+        store._product_codes = np.asarray(product_codes, dtype=np.int32)
+        store._quantities = np.asarray(quantities, dtype=np.int32)
+        store._payment_cents = np.asarray(payment_cents, dtype=np.int64)
+        store.size = len(store._dates)
+        store.product_ids = list(product_ids)
+        store.product_codes = {product_id: code for code, product_id in enumerate(store.product_ids)}
+        store.unparsed_rows = list(unparsed_rows)
+        store.dates_in_order = bool(np.all(store._dates[1:] >= store._dates[:-1]))
+        return store
+
+    @classmethod
+    def load_csv(cls, file_obj):
+        """Streams a sales CSV straight into column buffers without building a dict per row."""
+        day_numbers, seconds, product_codes = array('q'), array('i'), array('i')
+        quantities, payment_cents = array('i'), array('q')
+        product_ids, code_lookup, unparsed_rows = [], {}, []
+        parsed_dates, parsed_times = {}, {}
+        for values in iter_csv_columns(file_obj, TRANSACTION_COLUMNS):
+            date_str, time_str, product_id, quantity_str, payment_str = values
+            try:
+                day_number = parsed_dates.get(date_str)
+                if day_number is None:
+                    day_number = datetime.strptime(date_str, DATE_FORMAT).toordinal() - EPOCH_ORDINAL
+                    parsed_dates[date_str] = day_number
+                time_seconds = parsed_times.get(time_str)
+                if time_seconds is None:
+                    time_seconds = parse_time_seconds(time_str)
+                    parsed_times[time_str] = time_seconds
+                quantity = int(quantity_str)
+                cents = parse_cents(payment_str)
+                if product_id is None:
+                    raise ValueError("missing product id")
+            except (ValueError, TypeError, AttributeError):
+                unparsed_rows.append(dict(zip(TRANSACTION_COLUMNS, values)))
+                continue
+            code = code_lookup.get(product_id)
+            if code is None:
+                code = code_lookup[product_id] = len(product_ids)
+                product_ids.append(product_id)
+            day_numbers.append(day_number)
+            seconds.append(time_seconds)
+            product_codes.append(code)
+            quantities.append(quantity)
+            payment_cents.append(cents)
+        return cls.from_columns(day_numbers, seconds, product_codes, quantities, payment_cents, product_ids, unparsed_rows)
+
+    def __len__(self):
+        return self.size + len(self.unparsed_rows)
+
+    def csv_rows(self):
+        """Yields every row not held in the archive as a list of CSV strings, in TRANSACTION_COLUMNS order."""
+        date_strings = {}
+        first_row = self.archived_rows
+        day_numbers = self.dates.view(np.int64)[first_row:].tolist()
+        for day_number, seconds, code, quantity, cents in zip(
+                day_numbers, self.seconds[first_row:].tolist(), self.codes[first_row:].tolist(),
+                self.quantities[first_row:].tolist(), self.payment_cents[first_row:].tolist()):
+            date_str = date_strings.get(day_number)
+            if date_str is None:
+                date_str = date_strings[day_number] = date.fromordinal(day_number + EPOCH_ORDINAL).strftime(DATE_FORMAT)
+            yield [date_str, format_time_seconds(seconds), self.product_ids[code], str(quantity), format_cents(cents)]
+        for unparsed_row in self.unparsed_rows:
+            yield [unparsed_row.get(column) for column in TRANSACTION_COLUMNS]
+
+    @property
+    def dates(self):
+        return self._dates[:self.size]
+
+    @property
+    def seconds(self):
+        return self._seconds[:self.size]
+
+    @property
+    def codes(self):
+        return self._product_codes[:self.size]
+
+    @property
+    def quantities(self):
+        return self._quantities[:self.size]
+
+    @property
+    def payment_cents(self):
+        return self._payment_cents[:self.size]
+
+    def code_for(self, product_id):
+        return self.product_codes.get(str(product_id))
+
+    def codes_for(self, product_ids):
+        return np.array([self.product_codes[str(pid)] for pid in product_ids if str(pid) in self.product_codes],
+                        dtype=np.int32)
+
+    def _intern_product_id(self, product_id):
+        product_id = str(product_id)
+        code = self.product_codes.get(product_id)
+        if code is None:
+            code = len(self.product_ids)
+            self.product_codes[product_id] = code
+            self.product_ids.append(product_id)
+        return code
+
+    def _ensure_capacity(self, needed):
+        capacity = len(self._dates)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        for name in ('_dates', '_seconds', '_product_codes', '_quantities', '_payment_cents'):
+            old = getattr(self, name)
+            grown = np.empty(new_capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, transaction):
+        """Appends a Sale, or a dict of CSV strings that is parsed (or kept aside if it cannot be)."""
+        if not isinstance(transaction, Sale):
+            try:
+                transaction = Sale.from_row(transaction)
+            except (ValueError, TypeError, AttributeError):
+                self.unparsed_rows.append(transaction)
+                return None
+        return self.append_row(to_datetime64(transaction.date), transaction.seconds, transaction.product_id,
+                               transaction.quantity, transaction.payment_cents)
+
+    def append_row(self, date_value, seconds, product_id, quantity, cents):
+        self._ensure_capacity(self.size + 1)
+        row_index = self.size
+        if row_index and date_value < self._dates[row_index - 1]:
+            self.dates_in_order = False
+        self._date_order = None
+        self._sorted_dates = None
+        self._dates[row_index] = date_value
+        self._seconds[row_index] = seconds
+        product_code = self._intern_product_id(product_id)
+        self._product_codes[row_index] = product_code
+        self._quantities[row_index] = quantity
+        self._payment_cents[row_index] = cents
+        self.size += 1
+        self.generation += 1
+        if self._monthly_rollup is not None:
+            self._monthly_rollup.add(month_number_of(date_value), product_code, quantity, cents)
+        if self._product_postings is not None:
+            while len(self._product_postings) <= product_code:
+                self._product_postings.append(array('q'))
+            self._product_postings[product_code].append(row_index)
+        if self._stock_forecast is not None:
+            self._stock_forecast.add_sale(product_id, quantity,
+                                          int(date_value.astype(np.int64)) + seconds / SECONDS_PER_DAY)
+        return row_index
+
+    def extend_columns(self, day_numbers, seconds, product_ids, quantities, payment_cents):
+        """Appends many already validated rows at once; product_ids holds one id string per row."""
+        row_count = len(day_numbers)
+        if not row_count:
+            return
+        code_lookup = self.product_codes
+        codes = np.fromiter(
+            (code_lookup[product_id] if product_id in code_lookup else self._intern_product_id(product_id)
+             for product_id in product_ids),
+            dtype=np.int32, count=row_count
+        )
+        start, stop = self.size, self.size + row_count
+        self._ensure_capacity(stop)
+        self._dates[start:stop] = np.asarray(day_numbers, dtype=np.int64).view('datetime64[D]')
+        self._seconds[start:stop] = seconds
+        self._product_codes[start:stop] = codes
+        self._quantities[start:stop] = quantities
+        self._payment_cents[start:stop] = payment_cents
+        new_dates = self._dates[max(start - 1, 0):stop]
+        if self.dates_in_order and not np.all(new_dates[1:] >= new_dates[:-1]):
+            self.dates_in_order = False
+        self.size = stop
+        self.generation += 1
+        self._drop_derived_indexes()
+
+    def prepend_columns(self, day_numbers, seconds, product_ids, quantities, payment_cents):
+        """Inserts older rows before all current ones; used for archive blocks, so they count as archived."""
+        row_count = len(day_numbers)
+        if not row_count:
+            return
+        codes = np.fromiter((self._intern_product_id(product_id) for product_id in product_ids),
+                            dtype=np.int32, count=row_count)
+        for name, values in (('_dates', np.asarray(day_numbers, dtype=np.int64).view('datetime64[D]')),
+                             ('_seconds', seconds), ('_product_codes', codes),
+                             ('_quantities', quantities), ('_payment_cents', payment_cents)):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([np.asarray(values, dtype=column.dtype), column[:self.size]]))
+        self.size += row_count
+        self.archived_rows += row_count
+        self.dates_in_order = bool(np.all(self._dates[1:] >= self._dates[:-1]))
+        self.generation += 1
+        self._drop_derived_indexes()
+
+    def _drop_derived_indexes(self):
+        # The derived indexes are rebuilt on next use rather than updated row by row.
+        self._date_order = None
+        self._sorted_dates = None
+        self._monthly_rollup = None
+        self._product_postings = None
+        self._stock_forecast = None
+
+    def attach_archive(self, archive, history_start=None):
+        """Loads the archive blocks reaching back to history_start (None: all of them)."""
+        self.archive = archive
+        self.archive_from_day = None
+        self.ensure_history(history_start)
+
+    def ensure_history(self, start_date=None):
+        """Decompresses any archive blocks a query from start_date (None: all history) needs and has not loaded."""
+        if self.archive is None:
+            return
+        start_day = ARCHIVE_START_DAY if start_date is None else start_date.toordinal() - EPOCH_ORDINAL
+        if self.archive_from_day is not None and start_day >= self.archive_from_day:
+            return
+        blocks = self.archive.blocks_before(self.archive_from_day, start_day)
+        self.archive_from_day = start_day
+        if blocks:
+            self.prepend_columns(*self.archive.read_blocks(sorted(blocks, key=lambda block: block.first_day)))
+
+    def monthly_rollup(self, start_date=None):
+        """Monthly totals, once any archived months from start_date (None: all history) are loaded."""
+        self.ensure_history(start_date)
+        if self._monthly_rollup is None:
+            self._monthly_rollup = MonthlySalesRollup.build(self)
+        return self._monthly_rollup
+
+    def stock_forecast(self, inventory_records):
+        """Built from the full history on first use, then updated by each appended sale."""
+        if self._stock_forecast is None or self._stock_forecast.inventory_records is not inventory_records:
+            self._stock_forecast = StockForecast.build(self, inventory_records)
+            inventory_records.stock_forecast = self._stock_forecast
+        return self._stock_forecast
+
+    def product_sales_totals(self, start_date=None, end_date=None):
+        """Sales value (cents) and sale count per product code for the inclusive date range."""
+        self.ensure_history(start_date)
+        low, high = self._date_slice(start_date, end_date)
+        if not self.dates_in_order:
+            low, high = 0, self.size  # workers mask by date instead of using the sorted slice
+        first_day = None if start_date is None else to_datetime64(start_date)
+        last_day = None if end_date is None else to_datetime64(end_date)
+        return product_totals(self.dates, self.codes, self.payment_cents, len(self.product_ids),
+                              first_day, last_day, low, high, self.aggregation_workers)
+
+    def _date_slice(self, start_date, end_date):
+        if self.dates_in_order:
+            sorted_dates = self.dates
+        else:
+            if self._date_order is None:
+                self._date_order = np.argsort(self.dates, kind='stable')
+                self._sorted_dates = self.dates[self._date_order]
+            sorted_dates = self._sorted_dates
+        low = 0 if start_date is None else np.searchsorted(sorted_dates, to_datetime64(start_date), side='left')
+        high = len(sorted_dates) if end_date is None else np.searchsorted(sorted_dates, to_datetime64(end_date), side='right')
+        return int(low), int(high)
+
+    def date_range_count(self, start_date=None, end_date=None):
+        low, high = self._date_slice(start_date, end_date)
+        return high - low
+
+    def rows_in_date_range(self, start_date=None, end_date=None):
+        """Row indices (in insertion order) whose date falls within the inclusive range."""
+        low, high = self._date_slice(start_date, end_date)
+        if self.dates_in_order:
+            return np.arange(low, high)
+        return np.sort(self._date_order[low:high])
+
+    def filter_rows_by_date(self, rows, start_date=None, end_date=None):
+        dates = self._dates[rows]
+        mask = np.ones(len(rows), dtype=bool)
+        if start_date is not None:
+            mask &= dates >= to_datetime64(start_date)
+        if end_date is not None:
+            mask &= dates <= to_datetime64(end_date)
+        return rows[mask]
+
+    def _postings(self):
+        if self._product_postings is None:
+            order = np.argsort(self.codes, kind='stable')
+            boundaries = np.cumsum(np.bincount(self.codes, minlength=len(self.product_ids)))
+            self._product_postings = [array('q', chunk.tolist()) for chunk in np.split(order, boundaries[:-1])]
+        return self._product_postings
+
+    def product_row_count(self, product_codes):
+        postings = self._postings()
+        return sum(len(postings[code]) for code in product_codes if code < len(postings))
+
+    def rows_for_products(self, product_codes):
+        """Row indices (in insertion order) of the given products, read from their posting lists."""
+        postings = self._postings()
+        chunks = [np.array(postings[code], dtype=np.int64) for code in product_codes
+                  if code < len(postings) and postings[code]]
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        if len(chunks) == 1:
+            return chunks[0]
+        return np.sort(np.concatenate(chunks))
+
+    def row(self, row_index):
+        return Sale(
+            self._dates[row_index].astype(date),
+            int(self._seconds[row_index]),
+            self.product_ids[self._product_codes[row_index]],
+            int(self._quantities[row_index]),
+            int(self._payment_cents[row_index]),
+        )
+
+    def rows(self, row_indices):
+        return [self.row(row_index) for row_index in row_indices]
+
+    def view(self, row_indices):
+        return TransactionRowView(self, row_indices)
+
+
+class TransactionRowView:
+    """Query result that formats rows only when they are read, e.g. one page at a time."""
+
+    def __init__(self, transaction_records, row_indices):
+        self.transaction_records = transaction_records
+        self.row_indices = row_indices
+
+    def __len__(self):
+        return len(self.row_indices)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.transaction_records.rows(self.row_indices[key])
+        return self.transaction_records.row(self.row_indices[key])
+
+    def __iter__(self):
+        for row_index in self.row_indices:
+            yield self.transaction_records.row(row_index)
+
+    def totals(self):
+        return {
+            'count': len(self.row_indices),
+            'quantity': int(self.transaction_records.quantities[self.row_indices].sum()),
+            'payment_cents': int(self.transaction_records.payment_cents[self.row_indices].sum()),
+        }
+
+
+class DeferredTransactionStore:
+    """Stands in for a TransactionStore until a sales feature first reads the history.
+
+    New sales are buffered, so a till that only sells never has to load the file.
+    """
+
+    def __init__(self, load_func):
+        self._load_func = load_func
+        self._store = None
+        self._pending_appends = []
+
+    def loaded_store(self):
+        if self._store is None:
+            print("Loading sales history...")
+            store = self._load_func()
+            for transaction in self._pending_appends:
+                store.append(transaction)
+            self._pending_appends = []
+            self._store = store
+        return self._store
+
+    def append(self, transaction):
+        if self._store is None:
+            self._pending_appends.append(transaction)
+            return None
+        return self._store.append(transaction)
+
+    def __getattr__(self, name):
+        return getattr(self.loaded_store(), name)
+
+    def __len__(self):
+        return len(self.loaded_store())
+
+    def __bool__(self):
+        return bool(self._pending_appends) or len(self) > 0